@@ -103,13 +103,23 @@ class BatchJob:
 
 class BatchJobHandler:
 
-    def __init__(self, check_interval, check_timeout, batchitf, namer):
-        ""
+    def __init__(self, check_interval, check_timeout, batchitf, namer,
+                       query_interval=None):
+        """
+        The 'query_interval' is the minimum number of seconds between batch
+        queue queries, which defaults to the smaller of 'check_interval' and
+        15 seconds.
+        """
         self.check_interval = check_interval
         self.check_timeout = check_timeout
         self.batchitf = batchitf
         self.namer = namer
 
+        if query_interval is None:
+            query_interval = min( 15, check_interval )
+        self.query_interval = query_interval
+        self.tquery = None  # time of the last queue query
+
         self.todo  = {}
         self.submitted = {}
         self.stopped  = {}  # not in queue or shown as completed by the queue
@@ -224,19 +234,28 @@ class BatchJobHandler:
         ""
         doneL = []
 
-        startlist = list( self.getSubmitted() )
-
-        if len(startlist) > 0:
+        if self.numSubmitted() > 0 and self._is_time_to_query( time.time() ):
+            startlist = list( self.getSubmitted() )
             jobidL = [ bjob.getJobID() for bjob in startlist ]
             statusD = self.batchitf.queryJobs( jobidL )
             tnow = time.time()
-            for bjob in startlist:
-                status = statusD[ bjob.getJobID() ]
+            self.tquery = tnow
+            for jobid,bjob in zip( jobidL, startlist ):
+                status = statusD[ jobid ]
                 if self._check_stopped_job( bjob, status, tnow ):
                     doneL.append( bjob )
 
         return doneL
 
+    def _is_time_to_query(self, current_time):
+        """
+        The batch queue is not queried more often than the query interval,
+        because queue queries can be expensive and rate limited.  A job that
+        leaves the queue is noticed at the next query instead.
+        """
+        return self.tquery is None or \
+               current_time >= self.tquery + self.query_interval
+
     def _check_stopped_job(self, bjob, queue_status, current_time):
         """
         If job 'queue_status' is empty (meaning the job is not in the queue),
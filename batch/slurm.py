@@ -5,10 +5,18 @@
 # Government retains certain rights in this software.
 
 import os, sys
+import re
 
 from .helpers import format_shell_flags, runcmd
 
 
+# squeue short state codes that are reported by query()
+squeue_states = { 'R':'running', 'PD':'pending' }
+
+# matches sbatch output like "sbatch: Submitted batch job 291041"
+sbatch_jobid_pattern = re.compile( r'Submitted batch job\s+(\S+)' )
+
+
 class BatchSLURM:
 
     def __init__(self, **attrs):
@@ -45,14 +53,10 @@ class BatchSLURM:
         """
         x,cmd,out = runcmd( ['sbatch', fname] )
 
-        # output should contain something like the following
-        #    sbatch: Submitted batch job 291041
         jobid = None
-        i = out.find( "Submitted batch job" )
-        if i >= 0:
-            L = out[i:].split()
-            if len(L) > 3 and L[3]:
-                jobid = L[3]
+        m = sbatch_jobid_pattern.search( out )
+        if m:
+            jobid = m.group(1)
 
         return jobid,cmd,out
 
@@ -67,22 +71,20 @@ class BatchSLURM:
         cmdL = ['squeue', '--noheader', '-o', '%i %t', '--clusters=all']
         x,cmd,out = runcmd( cmdL )
 
+        jobids = set( jobids )
+
         jobs = {}
         err = ''
         for line in out.splitlines():
             # a line should be something like "16004759 PD"
-            line = line.strip()
-            if line:
-                L = line.split()
-                if len(L) == 2:
-                    jid,st = L
-                    if jid in jobids:
-                        if st in ['R']:
-                            jobs[jid] = 'running'
-                        elif st in ['PD']:
-                            jobs[jid] = 'pending'
-                else:
-                    err = '\n*** unexpected squeue output line: '+repr(line)
+            L = line.split()
+            if len(L) == 2:
+                jid,st = L
+                state = squeue_states.get( st, None )
+                if state and jid in jobids:
+                    jobs[jid] = state
+            elif len(L) > 0:
+                err = '\n*** unexpected squeue output line: '+repr(line.strip())
 
         return jobs,cmd,out+err
 
@@ -101,16 +103,8 @@ def HMSformat( nseconds ):
     if type(nseconds) == type(''):
         if ':' in nseconds:
             return nseconds
-    nseconds = int(nseconds)
-    nhrs = int( float(nseconds)/3600.0 )
-    t = nseconds - nhrs*3600
-    nmin = int( float(t)/60.0 )
-    nsec = t - nmin*60
-    if nsec < 10: nsec = '0' + str(nsec)
-    else:         nsec = str(nsec)
+    nhrs,rem = divmod( int(nseconds), 3600 )
+    nmin,nsec = divmod( rem, 60 )
     if nhrs == 0:
-        return str(nmin) + ':' + nsec
-    else:
-        if nmin < 10: nmin = '0' + str(nmin)
-        else:         nmin = str(nmin)
-    return str(nhrs) + ':' + nmin + ':' + nsec
+        return '%d:%02d' % ( nmin, nsec )
+    return '%d:%02d:%02d' % ( nhrs, nmin, nsec )
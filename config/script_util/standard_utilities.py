@@ -173,7 +173,7 @@ def _tracer_( frame, event, arg ):
 
 def print3( *args, **kwargs ):
     "a python 2 & 3 compatible print function"
-    s = " ".join( [ str(x) for x in args ] )
+    s = " ".join( map( str, args ) )
     if len(kwargs) > 0:
         L = [ str(k)+"="+str(v) for k,v in kwargs.items() ]
         s += " " + " ".join( L )
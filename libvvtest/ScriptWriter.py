@@ -5,6 +5,7 @@
 # Government retains certain rights in this software.
 
 import os, sys
+import textwrap
 from os.path import join as pjoin
 from os.path import dirname, normpath
 
@@ -16,40 +17,78 @@ except Exception:
 from .teststatus import DIFF_EXIT_STATUS, SKIP_EXIT_STATUS
 
 
-def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
+class ScriptContext:
+    """
+    The values used by writeScript() that are the same for every test in a
+    run.  Create one and pass it to writeScript() for each test.
+    """
+
+    def __init__(self, rtconfig, plat, loc):
+        ""
+        self.loc = loc
+        self.test_dir = loc.getTestingDirectory()
+
+        self.configdirs = rtconfig.getAttr('configdir')
+
+        self.tdir = rtconfig.getAttr('vvtestdir')
+        assert self.tdir
+
+        self.trigdir = pjoin( self.tdir, 'trig' )
+
+        self.exepath = rtconfig.getAttr('exepath')
+
+        self.onopts = rtconfig.getAttr('onopts')
+        self.offopts = rtconfig.getAttr('offopts')
+
+        self.platname = plat.getName()
+        self.cplrname = plat.getCompiler() or ''
+        self.platenv = plat.getEnvironment()
+
+        # the name script_util_plugin.sh is now deprecated, Dec 2021
+        self.sh_source_files = []
+        for d in self.configdirs[::-1]:
+            for fn in ['script_util.sh','script_util_plugin.sh']:
+                pn = pjoin( d, fn )
+                if os.path.isfile(pn):
+                    self.sh_source_files.append( pn )
+
+
+def writeScript( testcase, filename, lang, ctx ):
     """
     Writes a helper script for the test.  The script language is based on
-    the 'lang' argument.
+    the 'lang' argument.  The 'ctx' is a ScriptContext object.
     """
     tspec = testcase.getSpec()
     tstat = testcase.getStat()
     tname = tspec.getName()
+    filepath = tspec.getFilepath()
+    testid = tspec.getTestID().computeMatchString()
+    keywords = tspec.getKeywords( include_implicit=False )
 
-    troot = tspec.getRootpath()
-    srcdir = loc.path_to_source( tspec.getFilepath(), tspec.getRootpath() )
-
-    test_dir = loc.getTestingDirectory()
+    loc = ctx.loc
+    srcdir = loc.path_to_source( filepath, tspec.getRootpath() )
 
-    configdirs = rtconfig.getAttr('configdir')
+    test_dir = ctx.test_dir
+    configdirs = ctx.configdirs
+    tdir = ctx.tdir
+    trigdir = ctx.trigdir
 
-    tdir = rtconfig.getAttr('vvtestdir')
-    assert tdir
-
-    trigdir = pjoin( tdir, 'trig' )
-
-    projdir = rtconfig.getAttr('exepath')
+    projdir = ctx.exepath
     if projdir is None:
         projdir = ''
     else:
-        projdir = loc.path_to_file( tspec.getFilepath(), projdir )
+        projdir = loc.path_to_file( filepath, projdir )
 
-    onopts = rtconfig.getAttr('onopts')
-    offopts = rtconfig.getAttr('offopts')
+    onopts = ctx.onopts
+    offopts = ctx.offopts
 
-    platname = plat.getName()
-    cplrname = plat.getCompiler() or ''
+    platname = ctx.platname
+    cplrname = ctx.cplrname
+    platenv = ctx.platenv
 
-    timeout = testcase.getStat().getAttr( 'timeout', -1 )
+    timeout = tstat.getAttr( 'timeout', -1 )
+    procids = tstat.getAttr( 'processor ids' )
+    devids = tstat.getAttr( 'device ids', None )
 
     dep_list = testcase.getDepDirectories()
 
@@ -57,22 +96,23 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
 
     if lang == 'py':
 
-        w.add( 'import os, sys',
-               '',
-               'NAME = '+repr(tname),
-               'TESTID = '+repr( tspec.getTestID().computeMatchString() ),
-               'PLATFORM = '+repr(platname),
-               'COMPILER = '+repr(cplrname),
-               'VVTESTSRC = '+repr(tdir),
-               'TESTROOT = '+repr(test_dir),
-               'PROJECT = '+repr(projdir),
-               'OPTIONS = '+repr( onopts ),
-               'OPTIONS_OFF = '+repr( offopts ),
-               'SRCDIR = '+repr(srcdir),
-               'TIMEOUT = '+repr(timeout),
-               'KEYWORDS = '+repr(tspec.getKeywords(include_implicit=False)) )
-
-        w.add( 'CONFIGDIR = '+repr(configdirs) )
+        w.add( 'import os, sys', '' )
+
+        for name,val in [
+                ( 'NAME', tname ),
+                ( 'TESTID', testid ),
+                ( 'PLATFORM', platname ),
+                ( 'COMPILER', cplrname ),
+                ( 'VVTESTSRC', tdir ),
+                ( 'TESTROOT', test_dir ),
+                ( 'PROJECT', projdir ),
+                ( 'OPTIONS', onopts ),
+                ( 'OPTIONS_OFF', offopts ),
+                ( 'SRCDIR', srcdir ),
+                ( 'TIMEOUT', timeout ),
+                ( 'KEYWORDS', keywords ),
+                ( 'CONFIGDIR', configdirs ) ]:
+            w.add( '%s = %r' % ( name, val ) )
 
         # order matters; configdir should be the first entry in sys.path
         w.add( '',
@@ -92,20 +132,19 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
                'skip_exit_status = '+str(SKIP_EXIT_STATUS),
                'opt_analyze = "--execute-analysis-sections" in sys.argv[1:]' )
 
-        platenv = plat.getEnvironment()
         w.add( '',
                '# platform settings',
                'PLATFORM_VARIABLES = '+repr(platenv),
                'def apply_platform_variables():',
                '    "sets the platform variables in os.environ"' )
         for k,v in platenv.items():
-            w.add( '    os.environ["'+k+'"] = '+repr(v) )
+            w.add( '    os.environ["%s"] = %r' % ( k, v ) )
 
         w.add( '', '# parameters defined by the test' )
         paramD = tspec.getParameters( typed=True )
         w.add( 'PARAM_DICT = '+repr( paramD ) )
         for k,v in paramD.items():
-            w.add( k+' = '+repr(v) )
+            w.add( '%s = %r' % ( k, v ) )
 
         if tspec.isAnalyze():
             # the parameter names and values of the children tests
@@ -119,21 +158,18 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
                     n2 = '_'.join( n )
                     w.add( 'PARAM_'+n2+' = ' + repr(L) )
 
-        L = generate_dependency_list( dep_list, test_dir )
-        w.add( '', 'DEPDIRS = '+repr(L) )
-
-        D = generate_dependency_map( dep_list, test_dir )
-        w.add( '', 'DEPDIRMAP = '+repr(D) )
+        L,D = generate_dependency_list_and_map( dep_list, test_dir )
+        w.add( '', 'DEPDIRS = '+repr(L), '', 'DEPDIRMAP = '+repr(D) )
 
         w.add( '',
-               'RESOURCE_np = '+repr( len(tstat.getAttr('processor ids')) ),
-               'RESOURCE_IDS_np = '+repr(tstat.getAttr('processor ids')),
+               'RESOURCE_np = '+repr( len(procids) ),
+               'RESOURCE_IDS_np = '+repr(procids),
                'RESOURCE_TOTAL_np = '+repr(tstat.getAttr('total processors')) )
 
-        if tstat.getAttr('device ids',None):
+        if devids:
             w.add( '',
-               'RESOURCE_ndevice = '+repr( len(tstat.getAttr('device ids')) ),
-               'RESOURCE_IDS_ndevice = '+repr(tstat.getAttr('device ids')),
+               'RESOURCE_ndevice = '+repr( len(devids) ),
+               'RESOURCE_IDS_ndevice = '+repr(devids),
                'RESOURCE_TOTAL_ndevice = '+repr(tstat.getAttr('total devices')) )
         else:
             w.add( '',
@@ -145,49 +181,26 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
     
     elif lang in ['sh','bash']:
 
-        w.add( """
-            # save the command line arguments into variables
-            NUMCMDLINE=0
-            CMDLINE_VARS=
-            for arg in "$@" ; do
-                NUMCMDLINE=$((NUMCMDLINE+1))
-                eval CMDLINE_${NUMCMDLINE}='$arg'
-                CMDLINE_VARS="$CMDLINE_VARS CMDLINE_${NUMCMDLINE}"
-            done
-
-            # this function returns true if the given string was an
-            # argument on the command line
-            cmdline_option() {
-                optname=$1
-                for var in $CMDLINE_VARS ; do
-                    eval val="\$$var"
-                    [ "X$val" = "X$optname" ] && return 0
-                done
-                return 1
-            }
-
-            opt_analyze=0
-            cmdline_option --execute-analysis-sections && opt_analyze=1
-            """ )
-
-        w.add( '',
-               'NAME="'+tname+'"',
-               'TESTID="'+tspec.getTestID().computeMatchString()+'"',
-               'PLATFORM="'+platname+'"',
-               'COMPILER="'+cplrname+'"',
-               'VVTESTSRC="'+tdir+'"',
-               'TESTROOT="'+test_dir+'"',
-               'PROJECT="'+projdir+'"',
-               'OPTIONS="'+' '.join( onopts )+'"',
-               'OPTIONS_OFF="'+' '.join( offopts )+'"',
-               'SRCDIR="'+srcdir+'"',
-               'TIMEOUT="'+str(timeout)+'"',
-               'PYTHONEXE="'+sys.executable+'"' )
-
-        kwds = ' '.join( tspec.getKeywords(include_implicit=False) )
-        w.add( 'KEYWORDS="'+kwds+'"' )
-
-        w.add( 'CONFIGDIR="'+':'.join( configdirs )+'"' )
+        w.addLines( sh_cmdline_lines )
+
+        w.add( '' )
+
+        for name,val in [
+                ( 'NAME', tname ),
+                ( 'TESTID', testid ),
+                ( 'PLATFORM', platname ),
+                ( 'COMPILER', cplrname ),
+                ( 'VVTESTSRC', tdir ),
+                ( 'TESTROOT', test_dir ),
+                ( 'PROJECT', projdir ),
+                ( 'OPTIONS', ' '.join( onopts ) ),
+                ( 'OPTIONS_OFF', ' '.join( offopts ) ),
+                ( 'SRCDIR', srcdir ),
+                ( 'TIMEOUT', timeout ),
+                ( 'PYTHONEXE', sys.executable ),
+                ( 'KEYWORDS', ' '.join( keywords ) ),
+                ( 'CONFIGDIR', ':'.join( configdirs ) ) ]:
+            w.add( '%s="%s"' % ( name, val ) )
 
         w.add( '',
                'tmp=',
@@ -198,48 +211,43 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
                'diff_exit_status='+str(DIFF_EXIT_STATUS),
                'skip_exit_status='+str(SKIP_EXIT_STATUS) )
 
-        platenv = plat.getEnvironment()
         w.add( '',
                '# platform settings',
                'PLATFORM_VARIABLES="'+' '.join( platenv.keys() )+'"' )
         for k,v in platenv.items():
-            w.add( 'PLATVAR_'+k+'="'+v+'"' )
+            w.add( 'PLATVAR_%s="%s"' % ( k, sh_double_quote_escape( v ) ) )
         w.add( 'apply_platform_variables() {',
                '    # sets the platform variables in the environment' )
         for k,v in platenv.items():
-            w.add( '    export '+k+'="'+v+'"' )
+            w.add( '    export %s="%s"' % ( k, sh_double_quote_escape( v ) ) )
         if len(platenv) == 0:
             w.add( '    :' )  # cannot have an empty function
         w.add( '}' )
 
-        w.add( '', '# parameters defined by the test' )
-        paramD = tspec.getParameters()
-        s = ' '.join( [ n+'/'+v for n,v in paramD.items() ] )
-        w.add( 'PARAM_DICT="'+s+'"' )
-        for k,v in paramD.items():
-            w.add( k+'="'+v+'"' )
+        paramL = list( tspec.getParameters().items() )
+        w.add( '', '# parameters defined by the test',
+               'PARAM_DICT="%s"' % ' '.join( [ n+'/'+v for n,v in paramL ] ) )
+        w.addLines( [ '%s="%s"' % ( k, v ) for k,v in paramL ] )
 
         if tspec.isAnalyze():
             w.add( '', '# parameters comprising the children' )
             psetD = tspec.getParameterSet().getParameters()
-            if len(psetD) > 0:
-                # the parameter names and values of the children tests
-                for n,L in psetD.items():
-                    n2 = '_'.join( n )
-                    L2 = [ '/'.join( v ) for v in L ]
-                    w.add( 'PARAM_'+n2+'="' + ' '.join(L2) + '"' )
+            # the parameter names and values of the children tests
+            for n,L in psetD.items():
+                vals = ' '.join( [ '/'.join( v ) for v in L ] )
+                w.add( 'PARAM_%s="%s"' % ( '_'.join( n ), vals ) )
 
-        L = generate_dependency_list( dep_list, test_dir )
-        w.add( '', 'DEPDIRS="'+' '.join(L)+'"' )
+        depdirs = ' '.join( generate_dependency_list( dep_list, test_dir ) )
+        w.add( '', 'DEPDIRS="%s"' % depdirs )
 
-        sprocs = [ str(procid) for procid in tstat.getAttr('processor ids') ]
+        sprocs = [ str(procid) for procid in procids ]
         w.add( '',
                'RESOURCE_np="'+str( len(sprocs) )+'"',
                'RESOURCE_IDS_np="'+' '.join(sprocs)+'"',
                'RESOURCE_TOTAL_np="'+str(tstat.getAttr('total processors'))+'"' )
 
-        if tstat.getAttr('device ids',None):
-            sdevs = [ str(devid) for devid in tstat.getAttr('device ids') ]
+        if devids:
+            sdevs = [ str(devid) for devid in devids ]
             w.add( '',
                'RESOURCE_ndevice="'+str( len(sdevs) )+'"',
                'RESOURCE_IDS_ndevice="'+' '.join(sdevs)+'"',
@@ -250,12 +258,8 @@ def writeScript( testcase, filename, lang, rtconfig, plat, loc ):
                'RESOURCE_IDS_ndevice=""',
                'RESOURCE_TOTAL_ndevice="0"' )
 
-        # the name script_util_plugin.sh is now deprecated, Dec 2021
-        for d in configdirs[::-1]:
-            for fn in ['script_util.sh','script_util_plugin.sh']:
-                pn = pjoin( d, fn )
-                if os.path.isfile(pn):
-                    w.add( 'source '+quote(pn) )
+        for pn in ctx.sh_source_files:
+            w.add( 'source '+quote(pn) )
     
     w.write( filename )
 
@@ -269,64 +273,90 @@ class LineWriter:
 
     def add(self, *args):
         ""
-        if len(args) > 0:
-            indent = ''
-            if type(args[0]) == type(2):
-                n = args.pop(0)
-                indent = '  '*n
-            for line in args:
-                if line.startswith('\n'):
-                    for line in self._split( line ):
-                        self.lineL.append( indent+line )
-                else:
-                    self.lineL.append( indent+line )
+        self.lineL.extend( args )
 
-    def _split(self, s):
-        ""
-        off = None
-        lineL = []
-        for line in s.split( '\n' ):
-            line = line.strip( '\r' )
-            lineL.append( line )
-            if off == None and line.strip():
-                i = 0
-                for c in line:
-                    if c != ' ':
-                        off = i
-                        break
-                    i += 1
-        if off == None:
-            return lineL
-        return [ line[off:] for line in lineL ]
+    def addLines(self, lines):
+        """
+        Adds a list of lines as is, such as one from split_block_lines().
+        """
+        self.lineL.extend( lines )
 
     def write(self, filename):
         ""
-        fp = open( filename, 'w' )
-        fp.write( '\n'.join( self.lineL ) + '\n' )
-        fp.close()
+        with open( filename, 'w' ) as fp:
+            fp.write( '\n'.join( self.lineL ) )
+            fp.write( '\n' )
+
+
+def split_block_lines( s ):
+    """
+    Splits a triple quoted block of text into lines, with the common leading
+    indentation removed.
+    """
+    lineL = textwrap.dedent( s ).split( '\n' )
+    return [ line.strip( '\r' ) for line in lineL ]
+
+
+# the sh/bash script prologue is the same for every test, so split it once
+sh_cmdline_lines = split_block_lines( """
+            # save the command line arguments into variables
+            NUMCMDLINE=0
+            CMDLINE_VARS=
+            for arg in "$@" ; do
+                NUMCMDLINE=$((NUMCMDLINE+1))
+                eval CMDLINE_${NUMCMDLINE}='$arg'
+                CMDLINE_VARS="$CMDLINE_VARS CMDLINE_${NUMCMDLINE}"
+            done
+
+            # this function returns true if the given string was an
+            # argument on the command line
+            cmdline_option() {
+                optname=$1
+                for var in $CMDLINE_VARS ; do
+                    eval val="\$$var"
+                    [ "X$val" = "X$optname" ] && return 0
+                done
+                return 1
+            }
+
+            opt_analyze=0
+            cmdline_option --execute-analysis-sections && opt_analyze=1
+            """ )
+
+
+def sh_double_quote_escape( value ):
+    """
+    Escapes backslashes, double quotes and backquotes so the value can be
+    put inside double quotes in a shell script.  A $ is not escaped, so a
+    value can still refer to other variables.
+    """
+    s = str( value )
+    for c in '\\"`':
+        s = s.replace( c, '\\'+c )
+    return s
 
 
 def generate_dependency_list( dep_list, test_dir ):
     ""
-    L = [ pjoin( test_dir, T[1] ) for T in dep_list ]
-    L.sort()
-    return L
+    return sorted( [ pjoin( test_dir, depdir ) for _,depdir in dep_list ] )
 
 
-def generate_dependency_map( dep_list, test_dir ):
-    ""
+def generate_dependency_list_and_map( dep_list, test_dir ):
+    """
+    Returns the sorted list of dependency directories and the map of
+    dependency pattern to sorted list of directories, built in one pass.
+    """
+    L = []
     D = {}
 
     for pat,depdir in dep_list:
+        path = pjoin( test_dir, depdir )
+        L.append( path )
         if pat:
-            S = D.get( pat, None )
-            if S == None:
-                S = set()
-                D[ pat ] = S
-            S.add( pjoin( test_dir, depdir ) )
+            D.setdefault( pat, [] ).append( path )
 
-    for k,S in D.items():
-        D[ k ] = list( S )
-        D[ k ].sort()
+    L.sort()
+    for k,dL in D.items():
+        D[ k ] = sorted( set( dL ) )
 
-    return D
+    return L,D
@@ -6,7 +6,6 @@
 
 import os, sys
 import time
-import glob
 from os.path import abspath, normpath
 from os.path import join as pjoin
 
@@ -37,6 +36,7 @@ class TestList:
         self.tlistwriter = None
         self.groups = None  # a ParameterizeAnalyzeGroups class instance
         self.tcasemap = {}  # TestSpec ID -> TestCase object
+        self.active = None  # list of active TestCase objects, or None
 
     def setFilename(self, filename):
         ""
@@ -78,8 +78,7 @@ class TestList:
 
         tlw.start( rundate=self.rundate, **file_attrs )
 
-        for tcase in self.tcasemap.values():
-            tlw.append( tcase, extended=extended )
+        tlw.appendTests( self.tcasemap.values(), extended=extended )
 
         tlw.finish()
 
@@ -110,6 +109,13 @@ class TestList:
         """
         self.tlistwriter.append( tcase )
 
+    def appendTestResults(self, tcaselist):
+        """
+        Same as appendTestResult() for each TestCase, but written together.
+        """
+        if len( tcaselist ) > 0:
+            self.tlistwriter.appendTests( tcaselist )
+
     def writeFinished(self):
         """
         Appends the results file with a finish marker that contains the
@@ -124,16 +130,24 @@ class TestList:
         if os.path.exists( self.filename ):
 
             tlr = testlistio.TestListReader( self.fact, self.filename )
-            tlr.read()
+
+            self.active = None
+
+            # tests are merged as they are read; an existing test is kept
+            # unless it came from this file, where the last entry wins
+            newids = set()
+            for tcase in tlr.iterateTests():
+                tid = tcase.getSpec().getID()
+                if tid in newids:
+                    self.tcasemap[ tid ] = tcase
+                elif tid not in self.tcasemap:
+                    self.tcasemap[ tid ] = tcase
+                    newids.add( tid )
 
             rd = tlr.getAttr( 'rundate', None )
             if rd is not None:
                 self.rundate = rd
 
-            for xdir,tcase in tlr.getTests().items():
-                if xdir not in self.tcasemap:
-                    self.tcasemap[ xdir ] = tcase
-
     def readTestResults(self):
         """
         Glob for results filenames and read them all in increasing order
@@ -147,10 +161,7 @@ class TestList:
         ""
         file_attrs = {}
 
-        for fn in files:
-
-            tlr = testlistio.TestListReader( self.fact, fn )
-            tlr.read()
+        for tlr in read_test_list_files( self.fact, files ):
 
             self.startdate = tlr.getStartDate()
             self.finishdate = tlr.getFinishDate()
@@ -158,6 +169,7 @@ class TestList:
             file_attrs.clear()
             file_attrs.update( tlr.getAttrs() )
 
+            self.active = None
             for xdir,tcase in tlr.getTests().items():
                 self.tcasemap[ xdir ] = tcase
 
@@ -165,6 +177,7 @@ class TestList:
 
     def addTestsWithoutOverwrite(self, tcaselist):
         ""
+        self.active = None
         for tcase in tcaselist:
             tid = tcase.getSpec().getID()
             if tid not in self.tcasemap:
@@ -172,6 +185,7 @@ class TestList:
 
     def copyTestResults(self, tcaselist):
         ""
+        self.active = None
         for tcase in tcaselist:
             tspec = tcase.getSpec()
             t = self.tcasemap.get( tspec.getID(), None )
@@ -221,12 +235,14 @@ class TestList:
         return self.groups
 
     def countActive(self):
-        ""
-        cnt = 0
-        for tcase in self.tcasemap.values():
-            if not tcase.getStat().skipTest():
-                cnt += 1
-        self.numactive = cnt
+        """
+        Count the active tests and remember them, so later passes over the
+        active tests need not check every test in the list.  Call this again
+        after test skips change.
+        """
+        self.active = [ tcase for tcase in self.tcasemap.values()
+                                if not tcase.getStat().skipTest() ]
+        self.numactive = len( self.active )
 
     def numActive(self):
         """
@@ -249,32 +265,20 @@ class TestList:
         if not sorting:
             sorting = 'xd'
 
-        tL = []
+        keyfuncs = [ active_sort_keys[c] for c in sorting
+                                        if c in active_sort_keys ]
 
-        for idx,tcase in enumerate( self.tcasemap.values() ):
-            t = tcase.getSpec()
-            if not tcase.getStat().skipTest():
-                subL = []
-                for c in sorting:
-                    if c == 'n':
-                        subL.append( t.getName() )
-                    elif c == 'x':
-                        subL.append( t.getDisplayString() )
-                    elif c == 't':
-                        tm = tcase.getStat().getRuntime( None )
-                        if tm == None: tm = 0
-                        subL.append( tm )
-                    elif c == 'd':
-                        subL.append( tcase.getStat().getStartDate( 0 ) )
-                    elif c == 's':
-                        subL.append( tcase.getStat().getResultStatus() )
-
-                subL.extend( [ idx, tcase ] )
-                tL.append( subL )
-        tL.sort()
+        if self.active is None:
+            tL = [ tcase for tcase in self.tcasemap.values()
+                            if not tcase.getStat().skipTest() ]
+        else:
+            tL = list( self.active )
+
+        # the sort is stable, so ties stay in insertion order; reversing
+        # afterwards keeps the same order as the old decorated sort
+        tL.sort( key=lambda tcase: tuple( [ f(tcase) for f in keyfuncs ] ) )
         if 'r' in sorting:
             tL.reverse()
-        tL = [ L[-1] for L in tL ]
 
         return tL
 
@@ -282,6 +286,7 @@ class TestList:
         """
         Add/overwrite a test in the list.
         """
+        self.active = None
         self.tcasemap[ tcase.getSpec().getID() ] = tcase
 
     def createAnalyzeGroupMap(self):
@@ -304,6 +309,7 @@ class TestList:
         """
         tmap = self.getTestMap()
         groups = self.getGroupMap()
+        matchindex = depend.TestMatchIndex( tmap )
 
         for tcase in self.getTests():
             if not tcase.getStat().skipTest():
@@ -312,7 +318,9 @@ class TestList:
                     grpL = groups.getGroup( tcase )
                     depend.connect_analyze_dependencies( tcase, grpL, tmap )
 
-                depend.check_connect_dependencies( tcase, tmap, check_dependencies )
+                depend.check_connect_dependencies( tcase, tmap,
+                                                   check_dependencies,
+                                                   matchindex )
 
     def copyResultsIfStateChange(self, tests):
         """
@@ -324,14 +332,19 @@ class TestList:
         A list of tests whose state changed to "done" is returned.
         """
         donetests = []
+        changed = []
 
         for src_tcase in tests:
             tid = src_tcase.getSpec().getID()
             tstat = src_tcase.getStat()
             tcase = self._check_state_change( tid, tstat )
 
-            if tcase and tcase.getStat().isDone():
-                donetests.append( tcase )
+            if tcase:
+                changed.append( tcase )
+                if tcase.getStat().isDone():
+                    donetests.append( tcase )
+
+        self.appendTestResults( changed )
 
         return donetests
 
@@ -339,7 +352,7 @@ class TestList:
         """
         Finds the corresponding test in this TestList and if the result status
         is different, then the test results are copied into this object's
-        test and the test list file is appended.
+        test.
 
         Returns None if the test's result status did not change, or the test
         itself if the status did change.
@@ -350,16 +363,62 @@ class TestList:
         new = teststatus.getResultStatus()
 
         if new != old:
+            self.active = None
             copy_test_results( tcase.getStat(), teststatus )
-            self.appendTestResult( tcase )
             return tcase
 
         return None  # return None if no state change
 
 
+def read_test_list_files( tcasefactory, files, maxthreads=8 ):
+    """
+    Reads each file with a TestListReader and returns the readers in the
+    same order as the files.  Multiple files are read by threads so the
+    file I/O overlaps.  An exception from reading a file is raised here,
+    using the first failed file in the list.
+    """
+    from threadutil import map_with_threads
+
+    readers = [ testlistio.TestListReader( tcasefactory, fn ) for fn in files ]
+
+    map_with_threads( lambda tlr: tlr.read(), readers, maxthreads )
+
+    return readers
+
+
 def glob_results_files( basename ):
-    ""
+    """
+    Returns the sorted list of files named 'basename' plus a dot suffix,
+    which is what a glob of basename+'.*' matches.  The directory is listed
+    and the names prefix matched, to avoid the pattern matching in glob.
+    """
     assert basename
-    fileL = glob.glob( basename+'.*' )
+
+    dname,bname = os.path.split( basename )
+    prefix = bname+'.'
+
+    try:
+        nameL = os.listdir( dname or '.' )
+    except OSError:
+        return []
+
+    fileL = [ pjoin( dname, fn ) for fn in nameL if fn.startswith( prefix ) ]
     fileL.sort()
+
     return fileL
+
+
+def _sort_key_runtime( tcase ):
+    ""
+    tm = tcase.getStat().getRuntime( None )
+    if tm == None: tm = 0
+    return tm
+
+
+active_sort_keys = {
+    'n' : lambda tcase: tcase.getSpec().getName(),
+    'x' : lambda tcase: tcase.getSpec().getDisplayString(),
+    't' : _sort_key_runtime,
+    'd' : lambda tcase: tcase.getStat().getStartDate( 0 ),
+    's' : lambda tcase: tcase.getStat().getResultStatus(),
+}
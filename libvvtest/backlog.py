@@ -32,16 +32,30 @@ class TestBacklog:
         ""
         return self._pop_test( None )
 
-    def pop_by_size(self, maxsize):
-        ""
-        constraint = TestConstraint( maxsize )
+    def pop_by_size(self, maxsize, blocked=None):
+        """
+        If 'blocked' is given, it is a container of the TestSpec IDs of the
+        tests that are blocked by a dependency, which is used instead of
+        asking each test whether it is blocked.
+        """
+        constraint = TestConstraint( maxsize, blocked )
         return self._pop_test( constraint )
 
     def consume(self):
-        ""
-        while len( self.tests ) > 0:
-            tcase = self.tests.pop( 0 )
-            yield tcase
+        """
+        Removes and yields the tests in order.  The consumed tests are
+        deleted from the front of the list together when the consumer
+        finishes or stops, rather than with one pop(0) each.  The order of
+        the list does not change while it is being consumed.
+        """
+        idx = 0
+        try:
+            while idx < len( self.tests ):
+                tcase = self.tests[idx]
+                idx += 1
+                yield tcase
+        finally:
+            del self.tests[:idx]
 
     def iterate(self):
         ""
@@ -75,9 +89,10 @@ class TestBacklog:
 
 class TestConstraint:
 
-    def __init__(self, maxsize):
+    def __init__(self, maxsize, blocked=None):
         ""
         self.maxsize = maxsize
+        self.blocked = blocked
 
     def getMaxNP(self):
         ""
@@ -96,7 +111,10 @@ class TestConstraint:
             if np > maxnp or nd > maxnd:
                 return False
 
-        if tcase.isBlocked():
+        if self.blocked is None:
+            if tcase.isBlocked():
+                return False
+        elif tcase.getSpec().getID() in self.blocked:
             return False
 
         return True
@@ -17,6 +17,8 @@ from .testlistio import TestListReader, file_is_marked_finished
 from . import pathutil
 from .teststatus import copy_test_results
 
+from threadutil import map_with_threads
+
 
 class Batcher:
 
@@ -39,6 +41,8 @@ class Batcher:
 
         self.grouper = grouper
 
+        self.jobdirs = set()  # batch directories known to exist
+
     def getMaxJobs(self):
         ""
         return self.maxjobs
@@ -180,7 +184,7 @@ class Batcher:
         tl = grp.getTestList()
 
         bdir = dirname( bjob.getJobScriptName() )
-        check_make_directory( bdir, self.perms )
+        check_make_directory( bdir, self.perms, self.jobdirs )
 
         tname = tl.stringFileWrite( extended=True )
 
@@ -236,13 +240,19 @@ class Batcher:
                 self.results.readJobResults( bjob, tdoneL )
                 self.jobhandler.resetCheckTime( bjob, tnow )
 
-        for bjob in list( self.jobhandler.getStopped() ):
-            if self.jobhandler.isTimeToCheck( bjob, tnow ):
-                self._check_job_finish( bjob, tdoneL, tnow )
+        checkL = [ bjob for bjob in self.jobhandler.getStopped()
+                        if self.jobhandler.isTimeToCheck( bjob, tnow ) ]
 
-    def _check_job_finish(self, bjob, tdoneL, current_time):
+        # the file checks are small reads, often on a network file system,
+        # so they are done concurrently
+        cleanL = map_with_threads( self._check_for_clean_finish, checkL, 32 )
+
+        for bjob,clean in zip( checkL, cleanL ):
+            self._check_job_finish( bjob, clean, tdoneL, tnow )
+
+    def _check_job_finish(self, bjob, clean, tdoneL, current_time):
         ""
-        if self._check_for_clean_finish( bjob ):
+        if clean:
             self.results.readJobResults( bjob, tdoneL )
             self.results.completeResultsInclude( bjob )
             self.jobhandler.markJobDone( bjob, 'clean' )
@@ -281,9 +291,16 @@ class Batcher:
 
     def _remove_batch_directories(self):
         ""
-        for d in self.namer.globBatchDirectories():
-            logger.info( 'rm -rf {0}'.format(d) )
-            pathutil.fault_tolerant_remove( d )
+        dirs = list( self.namer.globBatchDirectories() )
+        for d in dirs:
+            logger.info( 'rm -rf {0}'.format(d), flush=False )
+        logger.flush()
+
+        # the removals are independent, so overlap their file system latency
+        errL = map_with_threads( try_remove_path, dirs, maxthreads=8 )
+        for err in errL:
+            if err is not None:
+                raise err
 
 
 class BatchTestGrouper:
@@ -308,12 +325,8 @@ class BatchTestGrouper:
 
     def _sort_groups(self):
         ""
-        sortL = []
-        for grp in self.batches:
-            sortL.append( ( grp.makeSortableKey(), grp ) )
-        sortL.sort( reverse=True )
-
-        self.batches = [ grp for _,grp in sortL ]
+        self.batches.sort( key=lambda grp: grp.makeSortableKey(),
+                           reverse=True )
 
     def _process_groups(self):
         ""
@@ -323,7 +336,7 @@ class BatchTestGrouper:
 
         back = self.tlist.getActiveTests()
         back.sort(
-            key=lambda tc: [ tc.getSize()[0], tc.getStat().getAttr('timeout') ],
+            key=lambda tc: ( tc.getSize()[0], tc.getStat().getAttr('timeout') ),
             reverse=True )
 
         for tcase in back:
@@ -452,21 +465,22 @@ def compute_job_size( tlist, nodesize ):
 
     if ppn:
         assert type(ppn) == type(2) and ppn > 0
-        numnd = int( mxnp/ppn )
-        if mxnp%ppn != 0:
-            numnd += 1
-        nn = max( nn, numnd )
+        nn = max( nn, ceiling_divide( mxnp, ppn ) )
 
     if dpn and mxnd > 0:
         assert type(dpn) == type(2) and dpn > 0
-        numnd = int( mxnd/dpn )
-        if mxnd%dpn != 0:
-            numnd += 1
-        nn = max( nn, numnd )
+        nn = max( nn, ceiling_divide( mxnd, dpn ) )
 
     return nn,mxnp,mxnd
 
 
+def ceiling_divide( num, denom ):
+    """
+    Integer division rounded up, for non-negative 'num' and positive 'denom'.
+    """
+    return ( num + denom - 1 ) // denom
+
+
 def apply_queue_timeout_bump_factor( qtime ):
     ""
     # allow more time in the queue than calculated. This overhead time
@@ -554,12 +568,29 @@ def get_relative_results_filename( tlist_from, to_bjob ):
     return pathutil.compute_relative_path( fromdir, tofile )
 
 
-def check_make_directory( dirname, perms ):
-    ""
+def try_remove_path( path ):
+    """
+    Removes 'path' and returns None, or returns the exception if one is raised.
+    """
+    try:
+        pathutil.fault_tolerant_remove( path )
+    except Exception as e:
+        return e
+    return None
+
+
+def check_make_directory( dirname, perms, madedirs=None ):
+    """
+    Creates the directory if it does not exist.  If 'madedirs' is a set, a
+    directory in it is assumed to exist, and 'dirname' is added to it.
+    """
     if dirname and dirname != '.':
-        if not os.path.exists( dirname ):
-            os.mkdir( dirname )
-            perms.apply( dirname )
+        if madedirs is None or dirname not in madedirs:
+            if not os.path.exists( dirname ):
+                os.mkdir( dirname )
+                perms.apply( dirname )
+            if madedirs is not None:
+                madedirs.add( dirname )
 
 
 def check_set_outfile_permissions( bjob, perms, curtime ):
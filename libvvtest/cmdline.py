@@ -222,6 +222,10 @@ def create_parser( argvlist, vvtest_version ):
         help='Limit the number of tests in each job group such that the '
              'sum of their runtimes is less than the given value (number '
              'of seconds or 10m or 2h or HH:MM:SS). Default is 30 minutes.' )
+    grp.add_argument( '--batch-poll', metavar='SECONDS',
+        help='The number of seconds between checks of the batch queue, '
+             'which can be fractional.  Default is 15, or the '
+             'VVTEST_BATCH_SLEEP_LENGTH environment variable.' )
     psr.add_argument( '--batch-id', type=int, help=argutil.SUPPRESS )
 
     # results
@@ -370,6 +374,12 @@ def adjust_options_and_create_derived_options( opts ):
                 raise Exception( 'cannot be negative: '+repr(opts.batch_length) )
             opts.batch_length = nsecs
 
+        errtype = 'batch-poll'
+        if opts.batch_poll is not None:
+            opts.batch_poll = float( opts.batch_poll )
+            if opts.batch_poll <= 0:
+                raise Exception( 'must be positive' )
+
         errtype = 'on/off options'
         onL,offL = clean_on_off_options( opts.dash_o, opts.dash_O )
         derived_opts['onopts'] = onL
@@ -5,6 +5,7 @@
 # Government retains certain rights in this software.
 
 import os, sys
+import re
 import fnmatch
 
 from . import logger
@@ -32,7 +33,8 @@ class DependencyPattern:
         self.expect = expect
         self.expr = result_word_expr
 
-    def find_deps(self, strict, testfile, params, testcasemap):
+    def find_deps(self, strict, testfile, params, testcasemap,
+                        matchindex=None):
         """
         Returns ( list of TestCase, failure reason ), where 'reason' is
         None on success.
@@ -40,19 +42,22 @@ class DependencyPattern:
         If 'strict' is True, then any issue gathering the dependencies is
         treated as a failure. If False, then all matching dependencies are
         gathered and returned in the list.
+
+        The optional 'matchindex' is a TestMatchIndex of 'testcasemap'.
         """
-        depL = self._find_tests( testfile, params, testcasemap )
+        depL = self._find_tests( testfile, params, testcasemap, matchindex )
         if self._matched_as_expected( depL, strict ):
             return depL,None
         else:
             reason = self._make_match_fail_reason( testfile, params, depL )
             return None,reason
 
-    def _find_tests(self, testfile, params, testcasemap):
+    def _find_tests(self, testfile, params, testcasemap, matchindex):
         ""
         srcdir = os.path.dirname( testfile )
         matchpat = self._make_match_pattern( testfile, params )
-        dep_ids = find_tests_by_pattern( srcdir, matchpat, testcasemap )
+        dep_ids = find_tests_by_pattern( srcdir, matchpat, testcasemap,
+                                         matchindex )
         depL = [ testcasemap[tid] for tid in dep_ids ]
         return depL
 
@@ -91,6 +96,9 @@ class TestDependency:
         self.matchpat = matchpat
         self.wordexpr = wordexpr
 
+        # the answer of satisfiesResult() depends only on the result string
+        self.satisfies = {}  # result string -> True/False
+
     def getTestID(self):
         ""
         return self.tcase.getSpec().getID()
@@ -108,14 +116,15 @@ class TestDependency:
         ""
         result = self.tcase.getStat().getResultStatus()
 
-        if self.wordexpr is None:
-            if result not in ['pass','diff']:
-                return False
-
-        elif not self.wordexpr.evaluate( result ):
-            return False
+        ok = self.satisfies.get( result, None )
+        if ok is None:
+            if self.wordexpr is None:
+                ok = ( result in ['pass','diff'] )
+            else:
+                ok = bool( self.wordexpr.evaluate( result ) )
+            self.satisfies[ result ] = ok
 
-        return True
+        return ok
 
     def getMatchDirectory(self):
         ""
@@ -228,7 +237,7 @@ class BadMatchReason:
         return s
 
 
-def find_tests_by_pattern( srcdir, pattern, testcasemap ):
+def find_tests_by_pattern( srcdir, pattern, testcasemap, matchindex=None ):
     """
     The 'srcdir' is the directory of the dependent test source file relative
     to the scan root.  The shell glob 'pattern' is matched against the match
@@ -246,6 +255,8 @@ def find_tests_by_pattern( srcdir, pattern, testcasemap ):
     them are included).
 
     A python set of TestSpec ID is returned.
+
+    If 'matchindex' is given, it must be a TestMatchIndex of 'testcasemap'.
     """
     if srcdir == '.':
         srcdir = ''
@@ -257,30 +268,71 @@ def find_tests_by_pattern( srcdir, pattern, testcasemap ):
     pat3 = pattern
     pat4 = '*'+pattern
 
-    L1 = [] ; L2 = [] ; L3 = [] ; L4 = []
+    if matchindex is None:
+        matchindex = TestMatchIndex( testcasemap )
 
-    for tid,tcase in testcasemap.items():
+    for pat in [ pat1, pat2, pat3, pat4 ]:
+        L = matchindex.findMatches( pat )
+        if len(L) > 0:
+            return collect_matching_test_ids( L, testcasemap )
 
-        tspec = tcase.getSpec()
-        mat = tspec.getTestID().computeMatchString()
+    return set()
 
-        if fnmatch.fnmatch( mat, pat1 ):
-            L1.append( tid )
 
-        if fnmatch.fnmatch( mat, pat2 ):
-            L2.append( tid )
+class TestMatchIndex:
+    """
+    Holds the match string of each test in a test case map, so the strings
+    are computed once for all the dependency patterns matched against them.
+    Patterns without glob characters are looked up directly.
+    """
 
-        if fnmatch.fnmatch( mat, pat3 ):
-            L3.append( tid )
+    def __init__(self, testcasemap):
+        ""
+        self.matchL = []  # list of ( TestSpec ID, match string )
+        self.exact = {}   # match string -> list of TestSpec ID
 
-        if fnmatch.fnmatch( mat, pat4 ):
-            L4.append( tid )
+        for tid,tcase in testcasemap.items():
+            mat = tcase.getSpec().getTestID().computeMatchString()
+            self.matchL.append( ( tid, mat ) )
+            self.exact.setdefault( mat, [] ).append( tid )
 
-    for L in [ L1, L2, L3, L4 ]:
-        if len(L) > 0:
-            return collect_matching_test_ids( L, testcasemap )
+    def findMatches(self, pattern):
+        """
+        Returns a list of TestSpec ID whose match string matches the shell
+        glob 'pattern'.
+        """
+        if not glob_chars_pattern.search( pattern ):
+            return self.exact.get( pattern, [] )
 
-    return set()
+        partL = pattern.split( '*' )
+        if len( partL ) == 2 and not glob_chars_pattern.search( ''.join( partL ) ):
+            # a single star, such as "srcdir/*/name" or "*name", is just a
+            # prefix and suffix test
+            head,tail = partL
+            n = len(head) + len(tail)
+            return [ tid for tid,mat in self.matchL
+                        if len(mat) >= n and mat.startswith( head )
+                                         and mat.endswith( tail ) ]
+
+        rx = compile_shell_pattern( pattern )
+        return [ tid for tid,mat in self.matchL if rx.match( mat ) ]
+
+
+glob_chars_pattern = re.compile( r'[*?[]' )
+
+shell_pattern_cache = {}
+
+def compile_shell_pattern( pattern ):
+    """
+    Returns the compiled regular expression for a shell glob 'pattern', as
+    used by fnmatch.fnmatch().  The compiled expressions are cached, because
+    the same patterns are matched for each test with the same dependency.
+    """
+    rx = shell_pattern_cache.get( pattern, None )
+    if rx is None:
+        rx = re.compile( fnmatch.translate( pattern ) )
+        shell_pattern_cache[ pattern ] = rx
+    return rx
 
 
 def collect_matching_test_ids( idlist, testcasemap ):
@@ -361,8 +413,12 @@ def connect_analyze_dependencies( analyze, tcaseL, testcasemap ):
                 gxt.setHasDependent()
 
 
-def check_connect_dependencies( tcase, testcasemap, strict=True ):
-    ""
+def check_connect_dependencies( tcase, testcasemap, strict=True,
+                                      matchindex=None ):
+    """
+    The optional 'matchindex' is a TestMatchIndex of 'testcasemap', which
+    should be given when connecting the dependencies of many tests.
+    """
     tspec = tcase.getSpec()
 
     for dpat in tspec.getDependencyPatterns():
@@ -370,7 +426,8 @@ def check_connect_dependencies( tcase, testcasemap, strict=True ):
         depL,reason = dpat.find_deps( strict,
                                       tspec.getFilepath(),
                                       tspec.getParameters(), 
-                                      testcasemap )
+                                      testcasemap,
+                                      matchindex )
 
         if depL is None:
             if strict:
@@ -43,6 +43,7 @@ class ExecutionHandler:
         self.shbang = shbang_supported
 
         self.commondb = None
+        self.scriptctx = None
 
     def create_execution_directory(self, tcase):
         ""
@@ -296,12 +297,13 @@ class ExecutionHandler:
             if self.rtconfig.getAttr('preclean') or \
                not os.path.exists( script_file ):
 
-                ScriptWriter.writeScript( tcase,
-                                          script_file,
-                                          lang,
-                                          self.rtconfig,
-                                          self.platform,
-                                          self.loc )
+                if self.scriptctx is None:
+                    self.scriptctx = ScriptWriter.ScriptContext( self.rtconfig,
+                                                                 self.platform,
+                                                                 self.loc )
+
+                ScriptWriter.writeScript( tcase, script_file, lang,
+                                          self.scriptctx )
 
                 self.perms.apply( os.path.abspath( script_file ) )
 
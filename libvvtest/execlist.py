@@ -20,6 +20,8 @@ class TestExecList:
         self.backlog = TestBacklog()
         self.started = {}  # TestSpec ID -> TestExec object
         self.stopped = {}  # TestSpec ID -> TestExec object
+        self.blocked = {}  # TestSpec ID -> TestCase waiting on a dependency
+        self.rev_deps = {}  # TestSpec ID -> list of TestCase depending on it
 
         self._prepare_test_backlog()
 
@@ -46,10 +48,10 @@ class TestExecList:
         For case #2, numRunning() will be zero.
         """
         # find longest runtime test with size constraint
-        tcase = self.backlog.pop_by_size( maxsize )
+        tcase = self.backlog.pop_by_size( maxsize, self.blocked )
         if tcase is None and len(self.started) == 0:
             # find longest runtime test without size constraint
-            tcase = self.backlog.pop_by_size( None )
+            tcase = self.backlog.pop_by_size( None, self.blocked )
 
         if tcase is not None:
             return self._move_to_started( tcase )
@@ -59,6 +61,7 @@ class TestExecList:
     def consumeBacklog(self):
         ""
         for tcase in self.backlog.consume():
+            self.blocked.pop( tcase.getSpec().getID(), None )
             texec = self._move_to_started( tcase )
             yield texec
 
@@ -70,6 +73,7 @@ class TestExecList:
         tL = []
         for tcase in self.backlog.consume():
             tL.append( tcase )
+        self.blocked.clear()
         return tL
 
     def getRunning(self):
@@ -80,11 +84,23 @@ class TestExecList:
 
     def testDone(self, texec):
         ""
-        tcase = texec.getTestCase()
-        xid = tcase.getSpec().getID()
-        self.tlist.appendTestResult( tcase )
-        self.started.pop( xid, None )
-        self.stopped[ xid ] = texec
+        self.testsDone( [ texec ] )
+
+    def testsDone(self, texecs):
+        """
+        Same as testDone() for each TestExec, but the results file is
+        appended once for all of them.
+        """
+        tcaseL = []
+        for texec in texecs:
+            tcase = texec.getTestCase()
+            xid = tcase.getSpec().getID()
+            tcaseL.append( tcase )
+            self.started.pop( xid, None )
+            self.stopped[ xid ] = texec
+            self._unblock_tests( xid )
+
+        self.tlist.appendTestResults( tcaseL )
 
     def numDone(self):
         """
@@ -109,6 +125,25 @@ class TestExecList:
 
         return texec
 
+    def _unblock_tests(self, done_xid):
+        """
+        A test can only become unblocked when one of its dependencies
+        finishes, so only the tests depending on the finished test are
+        checked here rather than in every popNext() call.
+        """
+        for tcase in self.rev_deps.get( done_xid, [] ):
+            xid = tcase.getSpec().getID()
+            if xid in self.blocked and not tcase.isBlocked():
+                self.blocked.pop( xid )
+
+    def _connect_reverse_dependencies(self, tcaseL):
+        ""
+        for tcase in tcaseL:
+            for tdep in tcase.getDependencies():
+                depid = tdep.getTestID()
+                if depid is not None:
+                    self.rev_deps.setdefault( depid, [] ).append( tcase )
+
     def _prepare_test_backlog(self):
         ""
         tL = self.tlist.getActiveTests()
@@ -122,3 +157,9 @@ class TestExecList:
 
         for tcase in tL:
             tcase.getStat().resetResults()
+
+        for tcase in tL:
+            if tcase.isBlocked():
+                self.blocked[ tcase.getSpec().getID() ] = tcase
+
+        self._connect_reverse_dependencies( tL )
@@ -6,6 +6,8 @@
 
 import os, sys
 import time
+import signal
+import select
 
 from . import logger
 from . import utesthooks
@@ -34,6 +36,17 @@ class TestListRunner:
         rfile = self.tlist.initializeResultsFile( **(self.rtinfo) )
         self.perms.apply( os.path.abspath( rfile ) )
 
+    def finish_cycle(self, doneL):
+        """
+        The steps ending each cycle of a runner loop, given the list of
+        TestCase objects that finished in the cycle.  Returns True if the
+        loop should stop.
+        """
+        self.results_writer.midrun( self.tlist )
+        self.info.printProgress( len(doneL) )
+
+        return self.total_time_expired()
+
     def total_time_expired(self):
         ""
         if self.total_timeout and self.total_timeout > 0:
@@ -47,12 +60,16 @@ class BatchRunner( TestListRunner ):
 
     def __init__(self, batch, test_dir, tlist, xlist, perms,
                        rtinfo, results_writer, plat,
-                       total_timeout ):
-        ""
+                       total_timeout, sleep_length=None ):
+        """
+        The 'sleep_length' is the maximum number of seconds between batch
+        queue checks.  If None, VVTEST_BATCH_SLEEP_LENGTH or 15 is used.
+        """
         TestListRunner.__init__( self, tlist, xlist, perms,
                                  rtinfo, results_writer, plat, total_timeout )
         self.batch = batch
         self.info = BatchInfoPrinter( test_dir, tlist, batch )
+        self.sleep_length = sleep_length
 
     def startup(self):
         ""
@@ -65,7 +82,11 @@ class BatchRunner( TestListRunner ):
         self.batch.clearBatchDirectories()
         self.batch.constructBatchJobs()
 
-        self.qsleep = int( os.environ.get( 'VVTEST_BATCH_SLEEP_LENGTH', 15 ) )
+        if self.sleep_length is None:
+            self.qsleep = float( os.environ.get( 'VVTEST_BATCH_SLEEP_LENGTH', 15 ) )
+        else:
+            self.qsleep = self.sleep_length
+        self.poll = PollInterval( min( 1, self.qsleep ), self.qsleep )
 
         logger.info('Maximum concurrent batch jobs: {0}'.format(self.batch.getMaxJobs()))
 
@@ -79,27 +100,24 @@ class BatchRunner( TestListRunner ):
 
             while True:
 
-                qid = self.batch.checkstart()
-                if qid is not None:
+                if self.start_jobs() > 0:
                     # nothing to print here because the qsubmit prints
-                    pass
+                    self.poll.reset()
                 elif self.batch.numInProgress() == 0:
                     break
                 else:
-                    self.sleep_with_info_check()
+                    self.sleep_with_info_check( self.poll.nextInterval() )
 
                 qidL,doneL = self.batch.checkdone()
+                if len(qidL) > 0 or len(doneL) > 0:
+                    self.poll.reset()
 
                 self.info.printFinishedBatches( qidL )
                 self.info.printFinished( doneL )
 
                 uthook.check( self.batch.numInProgress(), self.batch.numPastQueue() )
 
-                self.results_writer.midrun( self.tlist )
-
-                self.info.printProgress( len(doneL) )
-
-                if self.total_time_expired():
+                if self.finish_cycle( doneL ):
                     break
 
             # any remaining tests cannot be run, so flush them
@@ -115,11 +133,30 @@ class BatchRunner( TestListRunner ):
 
         return rtn
 
-    def sleep_with_info_check(self):
-        ""
-        for i in range( int( self.qsleep + 0.5 ) ):
+    def start_jobs(self):
+        """
+        Submits batch jobs until no more can be started, and returns the
+        number submitted.  The number submitted at once is bounded by the
+        batch limit.
+        """
+        num = 0
+        while self.batch.checkstart() is not None:
+            num += 1
+        return num
+
+    def sleep_with_info_check(self, seconds):
+        """
+        Sleeps in steps of at most one second, checking for info printing
+        each step.  The steps are measured to a deadline so the time spent
+        checking does not add to the total sleep.
+        """
+        deadline = time.time() + seconds
+        while True:
             self.info.checkPrint()
-            time.sleep( 1 )
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep( min( 1, remaining ) )
 
 
 class DirectRunner( TestListRunner ):
@@ -133,6 +170,8 @@ class DirectRunner( TestListRunner ):
         self.batch_id = None
         self.handler = xlist.getExecutionHandler()
         self.info = DirectInfoPrinter( test_dir, xlist, tlist.numActive() )
+        self.poll = PollInterval( 0.1, 1 )
+        self.wakeup = ChildExitWakeup()
 
     def setBatchID(self, batch_id):
         ""
@@ -149,6 +188,7 @@ class DirectRunner( TestListRunner ):
 
         uthook = utesthooks.construct_unit_testing_hook( 'run', self.batch_id )
 
+        self.wakeup.install()
         try:
             while True:
 
@@ -156,28 +196,28 @@ class DirectRunner( TestListRunner ):
 
                 if tnext is not None:
                     self.start_next( tnext )
+                    self.poll.reset()
                 elif self.xlist.numRunning() == 0:
                     break
                 else:
                     self.info.checkPrint()
-                    time.sleep(1)
+                    self.wakeup.sleep( self.poll.nextInterval() )
 
                 doneL = self.process_finished()
+                if len(doneL) > 0:
+                    self.poll.reset()
 
                 self.info.printFinished( doneL )
 
                 uthook.check( self.xlist.numRunning(), self.xlist.numDone() )
 
-                self.results_writer.midrun( self.tlist )
-
-                self.info.printProgress( len(doneL) )
-
-                if self.total_time_expired():
+                if self.finish_cycle( doneL ):
                     break
 
             nrL = self.xlist.popRemaining()  # these tests cannot be run
 
         finally:
+            self.wakeup.uninstall()
             self.tlist.writeFinished()
 
         self.info.printRemainders( nrL )
@@ -196,17 +236,124 @@ class DirectRunner( TestListRunner ):
 
     def process_finished(self):
         ""
-        doneL = []  # TestCase objects
+        finL = []
 
-        for texec in list( self.xlist.getRunning() ):
-            tcase = texec.getTestCase()
+        # testsDone() removes from the running tests, so it is called after
+        # the iteration rather than copying the running tests each time
+        for texec in self.xlist.getRunning():
             if texec.poll():
                 self.handler.finishExecution( texec )
             if texec.isDone():
-                self.xlist.testDone( texec )
-                doneL.append( tcase )
+                finL.append( texec )
+
+        self.xlist.testsDone( finL )
+
+        return [ texec.getTestCase() for texec in finL ]
 
-        return doneL
+
+class PollInterval:
+    """
+    A polling sleep interval that starts at a minimum and doubles, up to a
+    maximum, while nothing happens.  Call reset() when something happens, so
+    that short tests are noticed quickly but idle waits wake up less often.
+    """
+
+    def __init__(self, minimum, maximum):
+        ""
+        self.minval = minimum
+        self.maxval = maximum
+        self.current = minimum
+
+    def reset(self):
+        ""
+        self.current = self.minval
+
+    def nextInterval(self):
+        ""
+        ival = self.current
+        self.current = min( 2*self.current, self.maxval )
+        return ival
+
+
+class ChildExitWakeup:
+    """
+    Sleeps until a timeout expires or a child process exits, so a finished
+    test is noticed without waiting out the rest of the poll interval.
+
+    The SIGCHLD handler does nothing itself.  The signal is noticed through
+    a non-blocking pipe given to signal.set_wakeup_fd(), which the sleep
+    waits on with select().  No lock is taken in the signal handler, and a
+    child that exits before the sleep starts still ends it right away.
+
+    This is only done with Python 3, because Python 2 does not retry system
+    calls interrupted by a signal.
+    """
+
+    def __init__(self):
+        ""
+        self.installed = False
+        self.prev = None
+        self.prevfd = None
+        self.rfd = None
+        self.wfd = None
+
+    def install(self):
+        ""
+        if sys.version_info[0] > 2 and hasattr( signal, 'SIGCHLD' ):
+            rfd,wfd = os.pipe()
+            try:
+                os.set_blocking( rfd, False )
+                os.set_blocking( wfd, False )
+                self.prevfd = signal.set_wakeup_fd( wfd )
+            except ValueError:
+                # signal handlers can only be set in the main thread
+                os.close( rfd )
+                os.close( wfd )
+                return
+
+            self.rfd = rfd
+            self.wfd = wfd
+            self.prev = signal.signal( signal.SIGCHLD, self._child_exited )
+            self.installed = True
+
+    def uninstall(self):
+        ""
+        if self.installed:
+            if self.prev is None:
+                self.prev = signal.SIG_DFL
+            signal.signal( signal.SIGCHLD, self.prev )
+            signal.set_wakeup_fd( self.prevfd )
+            os.close( self.rfd )
+            os.close( self.wfd )
+            self.rfd = self.wfd = None
+            self.installed = False
+
+    def isInstalled(self):
+        ""
+        return self.installed
+
+    def sleep(self, seconds):
+        ""
+        if self.installed:
+            try:
+                select.select( [self.rfd], [], [], seconds )
+            except (OSError, select.error):
+                pass  # interrupted by a signal
+            self._drain()
+        else:
+            time.sleep( seconds )
+
+    def _drain(self):
+        ""
+        try:
+            while os.read( self.rfd, 512 ):
+                pass
+        except OSError:
+            pass  # the pipe is empty
+
+    def _child_exited(self, signum, frame):
+        ""
+        pass
 
 
 def run_baseline( xlist, plat ):
@@ -215,39 +362,50 @@ def run_baseline( xlist, plat ):
 
     handler = xlist.getExecutionHandler()
 
-    for texec in xlist.consumeBacklog():
+    poll = PollInterval( 0.01, 0.5 )
+    wakeup = ChildExitWakeup()
+    wakeup.install()
 
-        tcase = texec.getTestCase()
-        tspec = tcase.getSpec()
-        tstat = tcase.getStat()
+    try:
+        for texec in xlist.consumeBacklog():
 
-        xdir = tspec.getDisplayString()
+            tcase = texec.getTestCase()
+            tspec = tcase.getSpec()
+            tstat = tcase.getStat()
 
-        sys.stdout.write( "baselining "+xdir+"..." )
+            xdir = tspec.getDisplayString()
 
-        start_test( handler, texec, plat, is_baseline=True )
+            sys.stdout.write( "baselining "+xdir+"..." )
 
-        tm = int( os.environ.get( 'VVTEST_BASELINE_TIMEOUT', 30 ) )
-        for i in range(tm):
+            start_test( handler, texec, plat, is_baseline=True )
 
-            time.sleep(1)
+            tm = int( os.environ.get( 'VVTEST_BASELINE_TIMEOUT', 30 ) )
+            deadline = time.time() + tm
+            poll.reset()
 
-            if texec.poll():
-                handler.finishExecution( texec )
+            while time.time() < deadline:
 
-            if texec.isDone():
-                if tstat.passed():
-                    logger.info("done")
-                else:
-                    failures = True
-                    logger.info("FAILED")
-                break
+                wakeup.sleep( poll.nextInterval() )
 
-        if not tstat.isDone():
-            if texec.killJob():
-                handler.finishExecution( texec )
-            failures = True
-            logger.info("TIMED OUT")
+                if texec.poll():
+                    handler.finishExecution( texec )
+
+                if texec.isDone():
+                    if tstat.passed():
+                        logger.info("done")
+                    else:
+                        failures = True
+                        logger.info("FAILED")
+                    break
+
+            if not tstat.isDone():
+                if texec.killJob():
+                    handler.finishExecution( texec )
+                failures = True
+                logger.info("TIMED OUT")
+
+    finally:
+        wakeup.uninstall()
 
     if failures:
         logger.warn( "\n\n !!!!!!!!!!!  THERE WERE FAILURES  !!!!!!!!!! \n\n" )
@@ -272,17 +430,21 @@ def start_test( handler, texec, platform, is_baseline=False ):
     tcase.getStat().markStarted( texec.getStartTime() )
 
 
+result_warning_bits = {
+    'diff'    : 2**1,
+    'fail'    : 2**2,
+    'timeout' : 2**3,
+    'notdone' : 2**4,
+    'notrun'  : 2**5,
+}
+
 def encode_integer_warning( tlist ):
     ""
     ival = 0
 
     for tcase in tlist.getTests():
-        if not tcase.getStat().skipTest():
-            result = tcase.getStat().getResultStatus()
-            if   result == 'diff'   : ival |= ( 2**1 )
-            elif result == 'fail'   : ival |= ( 2**2 )
-            elif result == 'timeout': ival |= ( 2**3 )
-            elif result == 'notdone': ival |= ( 2**4 )
-            elif result == 'notrun' : ival |= ( 2**5 )
+        tstat = tcase.getStat()
+        if not tstat.skipTest():
+            ival |= result_warning_bits.get( tstat.getResultStatus(), 0 )
 
     return ival
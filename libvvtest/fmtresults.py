@@ -231,17 +231,20 @@ class TestResults:
 
         fp.close()
 
-    def readResults(self, filename):
+    def readResults(self, filename, header=None):
         """
         Loads the contents of the given file name into this object.
         A non-empty string is returned with an error message if the file
-        format is unknown or not a test results format.
+        format is unknown or not a test results format.  If the caller
+        already read the file header, it can be given as 'header'.
         """
         self.dataD = {}
         self.daterange = None
         self.dcache = {}
 
-        fmt,vers,self.hdr,nskip = read_file_header( filename )
+        if header is None:
+            header = read_file_header( filename )
+        fmt,vers,self.hdr,nskip = header
 
         if not fmt or fmt != 'results':
           raise Exception( "File format is not a single platform test " + \
@@ -314,13 +317,16 @@ class TestResults:
 
         fp.close()
 
-    def mergeRuntimes(self, filename):
+    def mergeRuntimes(self, filename, header=None):
         """
         Reads the given results file and for each test therein, it overwrites
         the current test if the execution date is more recent.  If the test
-        does not exist in this object yet, it is added.
+        does not exist in this object yet, it is added.  If the caller
+        already read the file header, it can be given as 'header'.
         """
-        fmt,vers,hdr,nskip = read_file_header( filename )
+        if header is None:
+            header = read_file_header( filename )
+        fmt,vers,hdr,nskip = header
 
         if not fmt or fmt != 'results':
             raise Exception( "File format is not a single platform test " + \
@@ -513,11 +519,15 @@ class MultiResults:
 
         fp.close()
 
-    def readFile(self, filename):
+    def readFile(self, filename, header=None):
         """
         Loads/merges the contents of the given file name into this object.
+        If the caller already read the file header, it can be given as
+        'header'.
         """
-        fmt,vers,self.hdr,nskip = read_file_header( filename )
+        if header is None:
+            header = read_file_header( filename )
+        fmt,vers,self.hdr,nskip = header
 
         if not fmt or fmt != "multi":
           raise Exception( "File format is not a multi-platform test " + \
@@ -818,11 +828,12 @@ class LookupCache:
               self.srcdirs[d] = None
               if os.path.exists(f):
                 try:
-                  fmt,vers,hdr,nskip = read_file_header( f )
+                  header = read_file_header( f )
+                  fmt = header[0]
                 except Exception:
                   fmt = None
                 if fmt and fmt == 'results':
-                  self.testDB.mergeRuntimes( f )
+                  self.testDB.mergeRuntimes( f, header )
                   break
 
               nd = os.path.dirname(d)
@@ -839,23 +850,23 @@ def make_attr_string( attrD ):
     """
     Returns a string containing the important attributes.
     """
-    s = ''
+    L = []
     v = attrD.get('xdate',None)
     if v != None and v > 0:
-      s = s + ' ' + '_'.join( time.ctime(v).split() )
+      L.append( '_'.join( time.ctime(v).split() ) )
     v = attrD.get('xtime',None)
     if v != None:
-      s = s + ' xtime=' + str(v)
+      L.append( 'xtime=' + str(v) )
     v = attrD.get('state',None)
     if v != None:
-      s = s + ' ' + v
+      L.append( v )
       if v == "done":
         rs = attrD.get('result',None)
         if rs != None:
-          s = s + ' ' + rs
+          L.append( rs )
     if 'TDD' in attrD:
-        s += ' TDD'
-    return s.strip()
+        L.append( 'TDD' )
+    return ' '.join( L ).strip()
 
 
 def read_attrs( attrL ):
@@ -891,12 +902,12 @@ def read_attrs( attrL ):
     return attrD
 
 
-def merge_multi_file( multi, filename, warnL, dcut, xopt, wopt ):
+def merge_multi_file( multi, filename, warnL, dcut, xopt, wopt, header=None ):
     """
     """
     tr = MultiResults()
     try:
-        tr.readFile( filename )
+        tr.readFile( filename, header )
     except Exception:
         warnL.append( "skipping multi-platform results file " + \
                       filename + ": Exception = " + str(sys.exc_info()[1]) )
@@ -909,19 +920,19 @@ def merge_multi_file( multi, filename, warnL, dcut, xopt, wopt ):
                 for pc in tr.platformList( d, tn ):
                     xD = multi.testAttrs( d, tn, pc )
                     aD = tr.testAttrs( d, tn, pc )
-                    if merge_check( xD, aD, dcut, xopt, wopt ):
+                    if merge_check( xD, aD, dcut, xopt, wopt ) and aD != xD:
                         newtest = True
                         multi.addTestName( d, tn, pc, aD )
 
     return newtest
 
 
-def merge_results_file( multi, filename, warnL, dcut, xopt, wopt ):
+def merge_results_file( multi, filename, warnL, dcut, xopt, wopt, header=None ):
     """
     """
     tr = TestResults()
     try:
-        tr.readResults( filename )
+        tr.readResults( filename, header )
     except Exception:
         warnL.append( "skipping results file " + filename + \
                       ": Exception = " + str(sys.exc_info()[1]) )
@@ -944,7 +955,7 @@ def merge_results_file( multi, filename, warnL, dcut, xopt, wopt ):
                 for tn in tL:
                     xD = multi.testAttrs( d, tn, pc )
                     aD = tr.testAttrs( d, tn )
-                    if merge_check( xD, aD, dcut, xopt, wopt ):
+                    if merge_check( xD, aD, dcut, xopt, wopt ) and aD != xD:
                         newtest = True
                         multi.addTestName( d, tn, pc, aD )
 
@@ -1050,25 +1061,30 @@ def parse_results_filename( filename ):
     return ftime, platname, opts, tag
 
 
-def read_results_file( filename, warnL ):
+def read_results_file( filename, warnL, parsed_name=None ):
     """
     Constructs a TestResults class and loads it with the contents of
     'filename', which is expected to be a results.<date>.* file.  Returns
     the file date, the TestResults object, and the results key.  If the read
     fails, then None,None,None is returned and the 'warnL' list is appended
-    with the error message.
+    with the error message.  If the file name was already parsed, the
+    parse_results_filename() tuple can be given as 'parsed_name'.
     """
     # parse the file name to get things like the date stamp
-    ftime,plat,opts,tag = parse_results_filename( filename )
+    if parsed_name is None:
+        parsed_name = parse_results_filename( filename )
+    ftime,plat,opts,tag = parsed_name
 
     try:
         assert ftime != None
 
         # try to read the file
-        fmt,vers,hdr,nskip = read_file_header( filename )
+        header = read_file_header( filename )
+        fmt = header[0]
         assert fmt == 'results', \
                 'expected a "results" file format, not "'+str(fmt)+'"'
-        tr = TestResults( filename )
+        tr = TestResults()
+        tr.readResults( filename, header )
 
         # the file header contains the platform & compiler names
         assert tr.platform() != None
@@ -35,9 +35,10 @@ def emit(*args, **kwargs):
     pre = kwargs.get("pre", "")
     end = kwargs.get("end", "")
     file = kwargs.get("file", sys.stdout)
-    message = " ".join(str(_) for _ in args)
+    message = " ".join(map(str, args))
     file.write("{0}{1}{2}".format(pre, message, end))
-    file.flush()
+    if kwargs.get("flush", True):
+        file.flush()
 
 
 def trace(*args, **kwargs):
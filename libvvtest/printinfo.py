@@ -37,7 +37,8 @@ class TestInformationPrinter:
         ""
         for tcase in done_list:
             ts = XstatusString( tcase, self.test_dir, self.cwd )
-            logger.xinfo("Finished: {0}".format(ts))
+            logger.xinfo("Finished: {0}".format(ts), flush=False)
+        logger.flush()
 
     def printProgress(self, ndone_test):
         ""
@@ -82,14 +83,15 @@ class DirectInfoPrinter( TestInformationPrinter ):
 
     def printStarting(self, tcase):
         ""
-        logger.xinfo('Starting: {0}'.format(exec_path( tcase, self.test_dir)))
+        xdir = exec_path( tcase, self.test_dir, self.cwd )
+        logger.xinfo('Starting: {0}'.format(xdir))
 
     def writeProgressInfo(self):
         ""
         pct = 100 * float(self.ndone) / float(self.ntotal)
-        div = str(self.ndone)+'/'+str(self.ntotal)
         dt = pretty_time( time.time()-self.starttime )
-        logger.xinfo("Progress: {0} {1:.1f}%, time = {2}".format(div, pct, dt))
+        logger.xinfo( "Progress: {0}/{1} {2:.1f}%, time = {3}".format(
+                            self.ndone, self.ntotal, pct, dt ) )
 
     def writeTestListInfo(self, now):
         ""
@@ -124,14 +126,15 @@ class BatchInfoPrinter( TestInformationPrinter ):
         ndone_batch = self.batcher.getNumDone()
         nprog_batch = self.batcher.numInProgress()
         pct = 100 * float(self.ndone) / float(self.ntotal)
-        fmt = "jobs running={0} completed={1}, tests {2}/{3} = {4:.1f}%, time = {5}"
-        args = [nprog_batch, ndone_batch, self.ndone, self.ntotal, pct, pretty_time(dt)]
-        logger.xinfo("Progress: " + fmt.format(*args))
+        fmt = "Progress: jobs running={0} completed={1}, " + \
+              "tests {2}/{3} = {4:.1f}%, time = {5}"
+        logger.xinfo( fmt.format( nprog_batch, ndone_batch, self.ndone,
+                                  self.ntotal, pct, pretty_time(dt) ) )
 
     def printFinishedBatches(self, qidL):
         ""
         if len(qidL) > 0:
-            ids = ' '.join( [ str(qid) for qid in qidL ] )
+            ids = ' '.join( map( str, qidL ) )
             logger.xinfo('Finished batch IDS: {0}'.format(ids))
 
     def writeTestListInfo(self, now):
@@ -176,10 +179,12 @@ def standard_in_has_data():
     return False
 
 
-def exec_path( tcase, test_dir ):
+def exec_path( tcase, test_dir, cwd=None ):
     ""
+    if cwd is None:
+        cwd = os.getcwd()
     xdir = tcase.getSpec().getDisplayString()
-    return pathutil.relative_execute_directory( xdir, test_dir, os.getcwd() )
+    return pathutil.relative_execute_directory( xdir, test_dir, cwd )
 
 
 def unicode_chars_supported(*uchars):
@@ -241,4 +246,6 @@ def print_notrun_reasons( notrunlist ):
     ""
     for tcase,reason in notrunlist:
         xdir = tcase.getSpec().getDisplayString()
-        logger.warn("test {0!r} notrun due to dependency: {1}".format(xdir, reason))
+        logger.warn("test {0!r} notrun due to dependency: {1}".format(xdir, reason),
+                    flush=False)
+    logger.flush( sys.stderr )
@@ -366,18 +366,24 @@ def DateInfoString( tm ):
 
 ####################################################################
 
-def read_all_results_files( files, globfiles, warnL ):
-    ""
+def read_all_results_files( files, globfiles, warnL, parsed=None ):
+    """
+    The optional 'parsed' dict maps file names to their already parsed
+    fmtresults.parse_results_filename() tuple.
+    """
+    if parsed is None:
+        parsed = {}
+
     rmat = ResultsMatrix()
 
     for f in files:
-        ftime,tr,rkey = fmtresults.read_results_file( f, warnL )
+        ftime,tr,rkey = fmtresults.read_results_file( f, warnL, parsed.get(f) )
         if ftime != None:
             tr.detail_ok = True  # inject a boolean flag to do detailing
             rmat.add( ftime, tr, rkey )
 
     for f in globfiles:
-        ftime,tr,rkey = fmtresults.read_results_file( f, warnL )
+        ftime,tr,rkey = fmtresults.read_results_file( f, warnL, parsed.get(f) )
         if ftime != None:
             tr.detail_ok = False  # inject a boolean flag to NOT do detailing
             rmat.add( ftime, tr, rkey )
@@ -1097,5 +1103,4 @@ def result_color( result ):
 
 def print3( *args ):
     ""
-    sys.stdout.write( ' '.join( [ str(x) for x in args ] ) + os.linesep )
-    sys.stdout.flush()
+    sys.stdout.write( ' '.join( map( str, args ) ) + os.linesep )
@@ -13,10 +13,16 @@ import glob
 
 try:
     import fmtresults
-    import reports
 except ImportError:
     from . import fmtresults
-    from . import reports
+
+try:
+    import threadutil
+except ImportError:
+    # run as a script, so the trig directory is not in sys.path
+    sys.path.append( os.path.join( os.path.dirname( os.path.dirname(
+                        os.path.realpath( __file__ ) ) ), 'trig' ) )
+    import threadutil
 
 
 usage_string = """
@@ -376,18 +382,21 @@ def multiplatform_merge( optD, fileL ):
     newtest = False
     for f in fileL:
         try:
-            fmt,vers,hdr,nskip = fmtresults.read_file_header( f )
+            header = fmtresults.read_file_header( f )
+            fmt = header[0]
         except Exception:
             warnL.append( "skipping results file: " + f + \
                           ", Exception = " + str(sys.exc_info()[1]) )
         else:
             
             if fmt and fmt == 'results':
-                if fmtresults.merge_results_file( mr, f, warnL, dcut, xopt, wopt ):
+                if fmtresults.merge_results_file( mr, f, warnL, dcut, xopt, wopt,
+                                                  header ):
                     newtest = True
             
             elif fmt and fmt == 'multi':
-                if fmtresults.merge_multi_file( mr, f, warnL, dcut, xopt, wopt ):
+                if fmtresults.merge_multi_file( mr, f, warnL, dcut, xopt, wopt,
+                                                header ):
                     newtest = True
             
             else:
@@ -415,13 +424,14 @@ def process_files( optD, fileL, fileG, **kwargs ):
 
     If '-d' is not in 'optD' and 'default_d' is contained in 'kwargs', then
     that value is used for the -d option.
+
+    Returns a dict mapping each file name that was parsed while filtering
+    to its fmtresults.parse_results_filename() tuple.
     """
     if '-g' in optD:
         gL = []
         for pat in optD['-g']:
-            L = [ (os.path.getmtime(f),f) for f in glob.glob( pat ) ]
-            L.sort()
-            gL.extend( [ f for t,f in L ] )
+            gL.extend( glob_by_date( pat ) )
         tmpL = gL + fileL
         del fileL[:]
         fileL.extend( tmpL )
@@ -429,96 +439,114 @@ def process_files( optD, fileL, fileG, **kwargs ):
     fLL = [ fileL ]
     if fileG != None and '-G' in optD:
         for pat in optD['-G']:
-            L = [ (os.path.getmtime(f),f) for f in glob.glob( pat ) ]
-            L.sort()
-            fileG.extend( [ f for t,f in L ] )
+            fileG.extend( glob_by_date( pat ) )
         fLL.append( fileG )
 
-    for fL in fLL:
+    filters = results_file_filters( optD, kwargs.get( 'default_d', None ) )
 
-        dval = optD.get( '-d', kwargs.get( 'default_d', None ) )
-        if dval != None:
-            dval = int(dval)
-            # filter out results files that are too old
-            cutoff = fmtresults.date_round_down( int( time.time() - dval*24*60*60 ) )
-            newL = []
-            for f in fL:
-                ft,plat,opts,tag = fmtresults.parse_results_filename( f )
-                if ft == None or ft >= cutoff:
-                    newL.append( f )
-            del fL[:]
-            fL.extend( newL )
-
-        platL = None
-        if '-p' in optD or '--plat' in optD:
-            platL = optD.get( '-p', [] ) + optD.get( '--plat', [] )
-        xplatL = optD.get( '-P', None )
-        if platL != None or xplatL != None:
-            # include/exclude results files based on platform name
-            newL = []
-            for f in fL:
-                ft,plat,opts,tag = fmtresults.parse_results_filename( f )
-                if plat == None or \
-                   ( platL == None or plat in platL ) and \
-                   ( xplatL == None or plat not in xplatL ):
-                    newL.append( f )
-            del fL[:]
-            fL.extend( newL )
-
-        if '-o' in optD:
-            # keep results files that are in the -o list
-            optnL = '+'.join( optD['-o'] ).split('+')
-            newL = []
-            for f in fL:
-                ft,plat,opts,tag = fmtresults.parse_results_filename( f )
-                if opts != None:
-                    # if at least one of the -o values from the command line
-                    # is contained in the file name options, then keep the file
-                    foptL = opts.split('+')
-                    for op in optnL:
-                        if op in foptL:
-                            newL.append( f )
-                            break
-                else:
-                    newL.append( f )  # don't apply filter to this file
-            del fL[:]
-            fL.extend( newL )
-
-        if '-O' in optD:
-            # exclude results files that are in the -O list
-            optnL = '+'.join( optD['-O'] ).split('+')
-            newL = []
+    parsed = {}
+    if len( filters ) > 0:
+        for fL in fLL:
+            keepL = []
             for f in fL:
                 ft,plat,opts,tag = fmtresults.parse_results_filename( f )
-                if opts != None:
-                    # if at least one of the -O values from the command line is
-                    # contained in the file name options, then exclude the file
-                    foptL = opts.split('+')
-                    keep = True
-                    for op in optnL:
-                        if op in foptL:
-                            keep = False
-                            break
-                    if keep:
-                        newL.append( f )
+                parsed[f] = ( ft, plat, opts, tag )
+                for func in filters:
+                    if not func( ft, plat, opts, tag ):
+                        break
                 else:
-                    newL.append( f )  # don't apply filter to this file
-            del fL[:]
-            fL.extend( newL )
-
-        tagL = optD.get( '-t', None )
-        xtagL = optD.get( '-T', None )
-        if tagL != None or xtagL != None:
-            # include/exclude based on tag
-            newL = []
-            for f in fL:
-                ft,plat,opts,tag = fmtresults.parse_results_filename( f )
-                if tag == None or \
-                   ( tagL == None or tag in tagL ) and \
-                   ( xtagL == None or tag not in xtagL ):
-                    newL.append( f )
-            del fL[:]
-            fL.extend( newL )
+                    keepL.append( f )
+            fL[:] = keepL
+
+    return parsed
+
+
+def results_file_filters( optD, default_d=None ):
+    """
+    Returns a list of functions f(date,platform,options,tag) that return
+    False if a results file with those file name parts should be removed.
+    """
+    filters = []
+
+    dval = optD.get( '-d', default_d )
+    if dval != None:
+        dval = int(dval)
+        # filter out results files that are too old
+        cutoff = fmtresults.date_round_down( int( time.time() - dval*24*60*60 ) )
+        filters.append( lambda ft,plat,opts,tag: ft == None or ft >= cutoff )
+
+    platL = None
+    if '-p' in optD or '--plat' in optD:
+        platL = optD.get( '-p', [] ) + optD.get( '--plat', [] )
+    xplatL = optD.get( '-P', None )
+    if platL != None or xplatL != None:
+        # include/exclude results files based on platform name
+        filters.append( lambda ft,plat,opts,tag:
+                            plat == None or \
+                            ( platL == None or plat in platL ) and \
+                            ( xplatL == None or plat not in xplatL ) )
+
+    # the -o and -O filters are not applied to files without options
+
+    if '-o' in optD:
+        # if at least one of the -o values from the command line is contained
+        # in the file name options, then keep the file
+        incS = set( '+'.join( optD['-o'] ).split('+') )
+        filters.append( lambda ft,plat,opts,tag:
+                            opts == None or \
+                            not incS.isdisjoint( opts.split('+') ) )
+
+    if '-O' in optD:
+        # if at least one of the -O values from the command line is contained
+        # in the file name options, then exclude the file
+        excS = set( '+'.join( optD['-O'] ).split('+') )
+        filters.append( lambda ft,plat,opts,tag:
+                            opts == None or \
+                            excS.isdisjoint( opts.split('+') ) )
+
+    tagL = optD.get( '-t', None )
+    xtagL = optD.get( '-T', None )
+    if tagL != None or xtagL != None:
+        # include/exclude based on tag
+        filters.append( lambda ft,plat,opts,tag:
+                            tag == None or \
+                            ( tagL == None or tag in tagL ) and \
+                            ( xtagL == None or tag not in xtagL ) )
+
+    return filters
+
+
+def glob_by_date( pattern ):
+    """
+    Returns the files matching the glob 'pattern' sorted by ascending file
+    modification time.  A pattern without wildcards is not globbed, and the
+    time stamps are only read if there is more than one file to sort.
+    """
+    if '*' in pattern or '?' in pattern or '[' in pattern:
+        fL = glob.glob( pattern )
+    elif os.path.exists( pattern ):
+        fL = [ pattern ]
+    else:
+        fL = []
+
+    if len( fL ) > 1:
+        L = list( zip( file_mtimes( fL ), fL ) )
+        L.sort()
+        fL = [ f for t,f in L ]
+
+    return fL
+
+
+def file_mtimes( fileL, maxthreads=16 ):
+    """
+    Returns the modification time of each file in 'fileL'.  For long lists,
+    the stat calls are made by threads so their latencies overlap, which
+    matters on network file systems.
+    """
+    if len( fileL ) <= 32:
+        return [ os.path.getmtime(f) for f in fileL ]
+
+    return threadutil.map_with_threads( os.path.getmtime, fileL, maxthreads )
 
 
 ########################################################################
@@ -558,7 +586,8 @@ def write_runtimes( optD, fileL ):
         # assume the current directory is the test tree root directory
         rootrel = os.path.basename( cwd )
     
-    # for each (test dir, test key) pair, store a list of tests attr dicts
+    # for each (test dir, test key) pair, store the runtime sum and count,
+    # and the attrs of the most recent test (see accumulate_runtime)
     testD = {}
     
     # read the tests from the source files; only save the tests that are
@@ -567,7 +596,8 @@ def write_runtimes( optD, fileL ):
     rrlen = len(rrdirL)
     for srcf in fileL:
       try:
-        fmt,vers,hdr,nskip = fmtresults.read_file_header( srcf )
+        header = fmtresults.read_file_header( srcf )
+        fmt = header[0]
       except Exception:
         warnL.append( "Warning: skipping results file: " + srcf + \
                      ", Exception = " + str(sys.exc_info()[1]) )
@@ -575,56 +605,39 @@ def write_runtimes( optD, fileL ):
         if fmt and fmt == 'results':
           src = fmtresults.TestResults()
           try:
-            src.readResults(srcf)
+            src.readResults( srcf, header )
           except Exception:
             warnL.append( "Warning: skipping results file: " + srcf + \
                          ", Exception = " + str(sys.exc_info()[1]) )
           else:
             for d in src.dirList():
-              if d.split('/')[:rrlen] == rrdirL:
+              if d.split('/',rrlen)[:rrlen] == rrdirL:
                 for tn in src.testList(d):
                   aD = src.testAttrs( d, tn )
                   if aD.get('result','') in ['pass','diff']:
-                    k = (d,tn)
-                    if k in testD: testD[k].append(aD)
-                    else:          testD[k] = [aD]
+                    accumulate_runtime( testD, (d,tn), aD )
         elif fmt and fmt == 'multi':
           src = fmtresults.MultiResults()
           try:
-            src.readFile(srcf)
+            src.readFile( srcf, header )
           except Exception:
             warnL.append( "Warning: skipping results file: " + srcf + \
                          ", Exception = " + str(sys.exc_info()[1]) )
           else:
             for d in src.dirList():
-              if d.split('/')[:rrlen] == rrdirL:
+              if d.split('/',rrlen)[:rrlen] == rrdirL:
                 for tn in src.testList(d):
                   for pc in src.platformList( d, tn ):
                     aD = src.testAttrs( d, tn, pc )
                     if aD.get('result','') in ['pass','diff']:
-                      k = (d,tn)
-                      if k in testD: testD[k].append(aD)
-                      else:          testD[k] = [aD]
+                      accumulate_runtime( testD, (d,tn), aD )
         else:
           warnL.append( "Warning: skipping results source file due to error: " + \
                        srcf + ", corrupt or unknown format" )
     
     # for each test, average the times found in the source files
     avgD = {}
-    for k,aL in testD.items():
-      d,tn = k
-      tsum = 0
-      tnum = 0
-      save_aD = None
-      for aD in aL:
-        t = aD.get( 'xtime', 0 )
-        if t > 0:
-          tsum += t
-          tnum += 1
-          # use the attributes of the test with the most recent date
-          if 'xdate' in aD:
-            if save_aD == None or save_aD['xdate'] < aD['xdate']:
-              save_aD = aD
+    for k,(tsum,tnum,save_aD) in testD.items():
       if save_aD != None:
         t = int( tsum/tnum )
         save_aD['xtime'] = t
@@ -638,9 +651,9 @@ def write_runtimes( optD, fileL ):
         rtf = os.path.join( dirname, fmtresults.runtimes_filename )
         if os.path.isfile(rtf):
             try:
-                fmt,vers,hdr,nskip = fmtresults.read_file_header( rtf )
-                rr = hdr.get( 'ROOT_RELATIVE', None )
-                trs.mergeRuntimes(rtf)
+                header = fmtresults.read_file_header( rtf )
+                rr = header[2].get( 'ROOT_RELATIVE', None )
+                trs.mergeRuntimes( rtf, header )
             except Exception:
                 msgs.append( "Warning: skipping existing runtimes file due to " + \
                              "error: " + rtf + ", Exception = " + \
@@ -654,7 +667,11 @@ def write_runtimes( optD, fileL ):
                   rtD[dirname] = rr
 
     for root,dirs,files in os.walk( cwd ):
-        read_src_dir( tr, rtdirD, warnL, root )
+        if fmtresults.runtimes_filename in files:
+            read_src_dir( tr, rtdirD, warnL, root )
+        # runtimes files are only in the source tree, so do not descend
+        # into test results or version control directories
+        dirs[:] = [ d for d in dirs if not skip_runtimes_search( d ) ]
 
     if '-w' in optD:
       # the -w option means don't merge
@@ -673,6 +690,35 @@ def write_runtimes( optD, fileL ):
     return warnL
 
 
+def accumulate_runtime( testD, key, attrD ):
+    """
+    Adds the runtime in 'attrD' to the running [sum, count, attrs] entry for
+    'key' in 'testD', so the attributes of every test occurrence need not be
+    kept to compute the average.  The attrs are those of the test with the
+    most recent date.
+    """
+    entry = testD.get( key, None )
+    if entry == None:
+        entry = [ 0, 0, None ]
+        testD[key] = entry
+
+    t = attrD.get( 'xtime', 0 )
+    if t > 0:
+        entry[0] += t
+        entry[1] += 1
+        if 'xdate' in attrD:
+            save_aD = entry[2]
+            if save_aD == None or save_aD['xdate'] < attrD['xdate']:
+                entry[2] = attrD
+
+
+def skip_runtimes_search( dirname ):
+    ""
+    return dirname.startswith( 'TestResults.' ) or \
+           dirname.startswith( 'Build_' ) or \
+           dirname in [ 'CVS', '.svn', '.git', '.hg' ]
+
+
 ########################################################################
 
 def results_listing( fname, optD ):
@@ -681,11 +727,12 @@ def results_listing( fname, optD ):
     the -p option means list the platform/compilers referenced by at least one
     test
     """
-    fmt,vers,hdr,nskip = fmtresults.read_file_header( fname )
+    header = fmtresults.read_file_header( fname )
+    fmt,vers,hdr,nskip = header
     
     if fmt and fmt == 'results':
       src = fmtresults.TestResults()
-      src.readResults(fname)
+      src.readResults( fname, header )
       
       if '-p' in optD:
         p = hdr.get( 'PLATFORM', '' )
@@ -700,24 +747,20 @@ def results_listing( fname, optD ):
             aD = src.testAttrs(d,tn)
             if 'xdate' in aD:
               tL.append( ( aD['xdate'], tn, d, aD ) )
-        tL.sort()
-        tL.reverse()
+        tL.sort( reverse=True )
         for xdate,tn,d,aD in tL:
           print3( fmtresults.make_attr_string(aD), d+'/'+tn )
     
     elif fmt and fmt == 'multi':
       src = fmtresults.MultiResults()
-      src.readFile(fname)
+      src.readFile( fname, header )
       
       if '-p' in optD:
-        pcD = {}
+        pcS = set()
         for d in src.dirList():
           for tn in src.testList(d):
-            for pc in src.platformList(d,tn):
-              pcD[pc] = None
-        pcL = list( pcD.keys() )
-        pcL.sort()
-        for pc in pcL:
+            pcS.update( src.platformList(d,tn) )
+        for pc in sorted( pcS ):
           print3( pc )
       
       else:
@@ -728,8 +771,7 @@ def results_listing( fname, optD ):
               aD = src.testAttrs(d,tn,pc)
               if 'xdate' in aD:
                 tL.append( ( aD['xdate'], tn, d, pc, aD ) )
-        tL.sort()
-        tL.reverse()
+        tL.sort( reverse=True )
         for xdate,tn,d,pc,aD in tL:
           print3( fmtresults.make_attr_string(aD), pc, d+'/'+tn )
     
@@ -762,7 +804,8 @@ def results_clean( path, optD ):
       msgL.append( "Warning: nothing to do without the -p option " + \
                    "(currently)" )
     
-    fmt,vers,hdr,nskip = fmtresults.read_file_header( path )
+    header = fmtresults.read_file_header( path )
+    fmt = header[0]
     if fmt and fmt == 'results':
       if '-p' in optD:
         msgL.append( "Warning: the -p option has no effect on results files" )
@@ -773,14 +816,21 @@ def results_clean( path, optD ):
         xpc = optD['-p']
         mr = fmtresults.MultiResults()
         src = fmtresults.MultiResults()
-        src.readFile(path)
+        src.readFile( path, header )
+        found = False
         for d in src.dirList():
           for tn in src.testList(d):
             for pc in src.platformList(d,tn):
               if pc != xpc:
                 aD = src.testAttrs( d, tn, pc )
                 mr.addTestName( d, tn, pc, aD )
-        mr.writeFile( path )
+              else:
+                found = True
+        if found:
+          mr.writeFile( path )
+        else:
+          msgL.append( "Warning: the -p value is not present in the file, " + \
+                       "no changes made: " + xpc )
       else:
         pass
     else:
@@ -810,6 +860,13 @@ def report_generation( optD, fileL ):
 
           $ results.py report -O dbg -O cxx11 -T dev results.*
     """
+    # only this subcommand needs the reports module, so it is imported here
+    # rather than for every invocation
+    try:
+        import reports
+    except ImportError:
+        from . import reports
+
     warnL = []
     curtm = time.time()
 
@@ -827,9 +884,9 @@ def report_generation( optD, fileL ):
 
     # this collects the files and applies filters
     fileG = []
-    process_files( optD, fileL, fileG, default_d=15 )
+    parsed = process_files( optD, fileL, fileG, default_d=15 )
 
-    rmat = reports.read_all_results_files( fileL, fileG, warnL )
+    rmat = reports.read_all_results_files( fileL, fileG, warnL, parsed )
 
     if len( rmat.testruns() ) == 0:
         print3( 'No results files to process (after filtering)' )
@@ -875,8 +932,7 @@ def get_results_plugin( optD ):
 
 def print3( *args ):
     ""
-    sys.stdout.write( ' '.join( [ str(x) for x in args ] ) + os.linesep )
-    sys.stdout.flush()
+    sys.stdout.write( ' '.join( map( str, args ) ) + os.linesep )
 
 
 def process_option( optD, option_name, value_type, *restrictions ):
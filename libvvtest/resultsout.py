@@ -10,10 +10,13 @@ class ResultsWriters:
     def __init__(self):
         ""
         self.writers = []
+        self.midrun_writers = []  # called every execution loop iteration
 
     def addWriter(self, writer):
         ""
         self.writers.append( writer )
+        if hasattr( writer, 'midrun' ):
+            self.midrun_writers.append( writer )
 
     def prerun(self, atestlist, verbosity):
         ""
@@ -23,9 +26,8 @@ class ResultsWriters:
 
     def midrun(self, atestlist):
         ""
-        for wr in self.writers:
-            if hasattr( wr, 'midrun' ):
-                wr.midrun( atestlist )
+        for wr in self.midrun_writers:
+            wr.midrun( atestlist )
 
     def postrun(self, atestlist):
         ""
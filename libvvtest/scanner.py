@@ -130,39 +130,38 @@ class TestFileScanner:
             testL = []
 
         for tspec in testL:
-            if not self._is_duplicate_execute_directory( tspec ):
+            xdir = tspec.getExecuteDirectory()
+            if not self._is_duplicate_execute_directory( tspec, xdir ):
                 tcase = self.fact.new( tspec )
                 if tspec.hasKeyword( 'TDD' ):
                     tcase.getStat().setAttr( 'TDD', True )
                 testlist.addTest( tcase )
-                self.xdirmap[ tspec.getExecuteDirectory() ] = tcase
+                self.xdirmap[ xdir ] = tcase
 
-    def _is_duplicate_execute_directory(self, tspec):
+    def _is_duplicate_execute_directory(self, tspec, xdir):
         ""
-        xdir = tspec.getExecuteDirectory()
-
         tcase0 = self.xdirmap.get( xdir, None )
+        if tcase0 == None:
+            return False
 
-        if tcase0 != None and \
-           not tests_are_related_by_staging( tcase0.getSpec(), tspec ):
-
-            tspec0 = tcase0.getSpec()
+        tspec0 = tcase0.getSpec()
+        if tests_are_related_by_staging( tspec0, tspec ):
+            return False
 
-            warn = [ 'ignoring test with duplicate execution directory',
-                     '      first   : ' + tspec0.getFilename(),
-                     '      second  : ' + tspec.getFilename(),
-                     '      exec dir: ' + xdir,
-                     '      stringid: ' + tspec.getDisplayString() ]
+        ddir = tspec.getDisplayString()
 
-            ddir = tspec.getDisplayString()
-            if ddir != xdir:
-                warn.append( '       test id : ' + ddir )
+        warn = [ 'ignoring test with duplicate execution directory',
+                 '      first   : ' + tspec0.getFilename(),
+                 '      second  : ' + tspec.getFilename(),
+                 '      exec dir: ' + xdir,
+                 '      stringid: ' + ddir ]
 
-            print_warning( self.warnout, '\n'.join( warn ) )
+        if ddir != xdir:
+            warn.append( '       test id : ' + ddir )
 
-            return True
+        print_warning( self.warnout, '\n'.join( warn ) )
 
-        return False
+        return True
 
 
 def is_vvtest_cache_directory( cdir ):
@@ -18,6 +18,8 @@ class TestCase:
         self.has_dependent = False
         self.resource_obj = None
 
+        self.size = None  # computed on first use; parameters do not change
+
     def getSpec(self):
         ""
         return self.tspec
@@ -28,7 +30,10 @@ class TestCase:
 
     def getSize(self):
         ""
-        return determine_test_size( self.getSpec().getParameters(), self.nsize )
+        if self.size is None:
+            self.size = determine_test_size( self.getSpec().getParameters(),
+                                             self.nsize )
+        return self.size
 
     def setHasDependent(self):
         ""
@@ -48,6 +48,14 @@ class TestListWriter:
         with open( self.filename, 'a' ) as fp:
             fp.write( test_to_string( tcase, extended ) + '\n' )
 
+    def appendTests(self, tcases, extended=False):
+        """
+        Same as append() for each test, but the file is opened only once.
+        """
+        lineL = [ test_to_string( tcase, extended ) + '\n' for tcase in tcases ]
+        with open( self.filename, 'a' ) as fp:
+            fp.write( ''.join( lineL ) )
+
     def finish(self):
         ""
         datestamp = repr( [ time.ctime(), time.time() ] )
@@ -73,7 +81,24 @@ class TestListReader:
 
     def read(self):
         ""
+        for tcase in self.iterateTests():
+            self.tests[ tcase.getSpec().getID() ] = tcase
+
+    def iterateTests(self):
+        """
+        Reads the file and yields each test as it is parsed, followed by the
+        tests in the include files.  A test ID can be yielded more than once,
+        in which case the last one is the current one.  The file attributes
+        are available once the iteration finishes.
+
+        The file version, which is written at the top of the file, is checked
+        before the first test is yielded, so a caller merging the tests as
+        they come never sees a test from a bad or unsupported file.
+        """
+        checked = False
+
         for key,val in self._iterate_file_lines():
+            tcase = None
             try:
                 if key == 'Version':
                     self.vers = int( val )
@@ -90,16 +115,21 @@ class TestListReader:
                     self.finish = eval( val )[1]
                 else:
                     tcase = string_to_test( val, self.fact )
-                    self.tests[ tcase.getSpec().getID() ] = tcase
 
             except Exception:
                 pass
 
-        assert self.vers in [32, 33, 34, 35], \
-            'corrupt test list file or older format: '+str(self.filename)
+            if tcase is not None:
+                if not checked:
+                    self._check_file_version()
+                    checked = True
+                yield tcase
+
+        self._check_file_version()
 
         for incl_file in self.incl:
-            self._read_include_file( incl_file )
+            for tcase in self._iterate_include_file( incl_file ):
+                yield tcase
 
     def getFileVersion(self):
         ""
@@ -144,6 +174,11 @@ class TestListReader:
 
         return finish
 
+    def _check_file_version(self):
+        ""
+        assert self.vers in [32, 33, 34, 35], \
+            'corrupt test list file or older format: '+str(self.filename)
+
     def _iterate_file_lines(self):
         ""
         with open( self.filename, 'r' ) as fp:
@@ -163,7 +198,7 @@ class TestListReader:
                 except Exception:
                     pass
 
-    def _read_include_file(self, fname):
+    def _iterate_include_file(self, fname):
         ""
         if not os.path.isabs( fname ):
             # include file is relative to self.filename
@@ -172,8 +207,8 @@ class TestListReader:
         if os.path.exists( fname ):
 
             tlr = TestListReader( self.fact, fname )
-            tlr.read()
-            self.tests.update( tlr.getTests() )
+            for tcase in tlr.iterateTests():
+                yield tcase
 
 
 def file_is_marked_finished( filename ):
@@ -18,6 +18,7 @@ import glob
 
 import pythonproxy as rpy
 
+import threadutil
 import perms
 
 
@@ -228,6 +229,7 @@ def create_remote_proxy( mach, sshexe, timeout, echo ):
     rmt.send( 'import glob',
               'import shutil',
               'import time',
+              threadutil,
               perms,
               check_dir,
               glob_paths,
@@ -17,6 +17,7 @@ import stat
 
 import pythonproxy as rpy
 
+import threadutil
 import perms
 
 
@@ -199,6 +200,7 @@ def create_remote_proxy( mach, sshexe, timeout, echo ):
               'import time',
               'import hashlib',
               'import fnmatch',
+              threadutil,
               perms,
               list_files,
               long_list_files,
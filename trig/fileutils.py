@@ -17,6 +17,7 @@ from os.path import abspath, normpath, realpath, dirname
 import pipes
 import subprocess
 
+import threadutil
 import perms
 
 
@@ -138,7 +139,7 @@ def check_load_modules( proxy ):
     proxy.send( modules_available )
 
     if not proxy.modules_available():
-        proxy.send( perms, sys.modules['fileutils'] )
+        proxy.send( threadutil, perms, sys.modules['fileutils'] )
 
     fu = proxy.import_module( 'fileutils' )
     su = proxy.import_module( 'shutil' )
@@ -11,12 +11,16 @@ import os
 from os.path import abspath, normpath, basename, dirname
 from os.path import join as pjoin
 import time
-import pipes
 import shutil
 import tempfile
 import subprocess
 import re
 
+try:
+    from shlex import quote
+except Exception:
+    from pipes import quote
+
 
 class GitInterfaceError( Exception ):
     pass
@@ -61,7 +65,7 @@ class GitRepo:
 
     def commit(self, message, verbose=0):
         ""
-        self.run( 'commit -m', pipes.quote(message), verbose=verbose )
+        self.run( 'commit -m', quote(message), verbose=verbose )
 
     def status(self, verbose=0):
         ""
@@ -154,7 +158,7 @@ class GitRepo:
 
     def checkout_branch(self, branchname, verbose=0):
         ""
-        if branchname != self.get_branch():
+        if branchname != _symbolic_branch_name( self.grun, verbose ):
             if branchname in self.get_branches():
                 self.run( 'checkout', branchname, verbose=verbose )
             elif branchname in self.get_branches( remotes=True ):
@@ -251,6 +255,37 @@ class GitRepo:
 
         self.run( 'push --delete origin', branchname, verbose=verbose )
 
+    def get_file_contents(self, ref, filename, verbose=0):
+        """
+        Returns the contents of 'filename' (relative to the top level) as it
+        exists in the branch, tag or commit 'ref', without checking it out.
+        Returns None if the file does not exist in 'ref'.
+        """
+        x,out = self.run( 'show', quote( ref+':'+filename ),
+                          raise_on_error=False, capture=True,
+                          verbose=verbose )
+        if x != 0:
+            return None
+        return out
+
+    def commit_file_to_branch(self, branchname, filename, contents, message,
+                                    verbose=0):
+        """
+        Commits 'contents' as the file 'filename' (relative to the top level)
+        onto the local branch 'branchname' without checking out the branch,
+        so the working tree is not touched.  The branch must exist and must
+        not be the current branch.
+        """
+        if branchname == self.get_branch():
+            raise GitInterfaceError(
+                    'cannot commit to the current branch: '+branchname )
+
+        if branchname not in self.get_branches():
+            raise GitInterfaceError( 'branch does not exist: '+branchname )
+
+        _commit_file_to_branch( self.grun, branchname, filename, contents,
+                                message, verbose )
+
     def get_tags(self, verbose=0):
         ""
         x,out = self.run( 'tag --list --no-column',
@@ -280,7 +315,7 @@ class GitRepo:
         if tagname in self.get_tags( verbose=verbose ):
             raise GitInterfaceError( 'tag already exists: '+repr(tagname) )
 
-        self.run( 'tag -m', pipes.quote( commit_message ), tagname,
+        self.run( 'tag -m', quote( commit_message ), tagname,
                   verbose=verbose )
 
     def is_bare(self, verbose=0):
@@ -305,6 +340,14 @@ class GitRepo:
         """
         return self.grun.run( arg0, *args, **kwargs )
 
+    def start(self, arg0, *args):
+        """
+        Like run() but the git command is started in the background and its
+        output is captured.  Returns a BackgroundCommand object; call its
+        wait() method to get the exit status and output.
+        """
+        return self.grun.start( arg0, *args )
+
 
 def create_repo( directory=None, bare=False, **options):
     """
@@ -335,12 +378,18 @@ def create_repo( directory=None, bare=False, **options):
     return GitRepo( directory=top, **options )
 
 
-def clone_repo( url, directory=None, branch=None, bare=False, **options ):
+def clone_repo( url, directory=None, branch=None, bare=False,
+                reference=None, partial=False, **options ):
     """
     If 'branch' is None, all branches are fetched.  If a branch name (such
     as "master") then only that branch is fetched.  If 'directory' is not
     None, it will contain the repository.
 
+    If 'reference' is the path to a local repository, objects found there
+    are not downloaded (they are copied from the reference instead).  If
+    'partial' is True, file contents are only fetched when needed.  See
+    clone_flags().
+
     Options can be 'verbose', 'https_proxy', 'gitexe'.
 
     Returns a GitRepo object set to the cloned repository.
@@ -351,15 +400,39 @@ def clone_repo( url, directory=None, branch=None, bare=False, **options ):
     if branch and bare:
         raise GitInterfaceError( 'cannot bare clone a single branch' )
 
+    flags = clone_flags( reference, partial )
+
     if branch:
+        if flags:
+            raise GitInterfaceError( 'cannot use a reference repository '
+                                     'or partial clone with a single branch' )
         top = _branch_clone( grun, url, directory, branch, verb )
     else:
-        top = _full_clone( grun, url, directory, bare, verb )
+        top = _full_clone( grun, url, directory, bare, verb, flags )
 
     options['verbose'] = max( 0, verb-1 )
     return GitRepo( top, **options )
 
 
+def clone_flags( reference=None, partial=False ):
+    """
+    Returns the extra "git clone" command line options (a string) for
+    borrowing objects from a local 'reference' repository and for a
+    'partial' (blobless) clone.  The reference is dissociated after the
+    clone, so the new repository does not depend on it.
+    """
+    flags = ''
+
+    if reference:
+        flags += ' --reference-if-able '+quote( abspath( reference ) )
+        flags += ' --dissociate'
+
+    if partial:
+        flags += ' --filter=blob:none'
+
+    return flags
+
+
 def get_remote_branches( url, **options ):
     """
     Get the list of branches on the remote repository 'url' (which can be
@@ -479,6 +552,15 @@ class GitRunner:
 
         return x, out
 
+    def start(self, arg0, *args):
+        """
+        Starts the git command without waiting for it, and without changing
+        the current directory of this process.
+        """
+        cmd = self.gitexe + ' ' + ' '.join( (arg0,)+args )
+
+        return BackgroundCommand( cmd, self.chdir, self.envars )
+
     def setRunDirectory(self, rundir):
         ""
         self.chdir = rundir
@@ -488,6 +570,42 @@ class GitRunner:
         return self.chdir
 
 
+class BackgroundCommand:
+    """
+    Runs a shell command in a subprocess, capturing stdout and stderr
+    together.
+    """
+
+    def __init__(self, cmd, chdir=None, envars={}):
+        ""
+        self.cmd = cmd
+        self.chdir = chdir
+
+        env = None
+        if envars:
+            env = dict( os.environ )
+            env.update( envars )
+
+        self.po = subprocess.Popen( cmd, shell=True, cwd=chdir, env=env,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT )
+
+    def getCommand(self):
+        ""
+        return self.cmd
+
+    def getDirectory(self):
+        ""
+        return self.chdir
+
+    def wait(self):
+        """
+        Waits for the command to finish, then returns ( exit status, output ).
+        """
+        sout,serr = self.po.communicate()
+        return self.po.returncode, _STRING_(sout)
+
+
 def get_repo_toplevel( gitrun, directory=None, verbose=0 ):
     ""
     if not directory:
@@ -561,9 +679,9 @@ def _branch_clone( grun, url, directory, branch, verbose ):
     return top
 
 
-def _full_clone( grun, url, directory, bare, verbose ):
+def _full_clone( grun, url, directory, bare, verbose, flags='' ):
     ""
-    cmd = 'clone'
+    cmd = 'clone'+flags
     if bare:
         cmd += ' --bare'
 
@@ -623,7 +741,7 @@ def _add_files_to_index( gitrun, files, verbose ):
 
 def _quote_files( filelist ):
     ""
-    return [ pipes.quote(f) for f in filelist ]
+    return [ quote(f) for f in filelist ]
 
 
 def _make_files_relative_to_toplevel( top, files ):
@@ -759,6 +877,19 @@ def _current_branch_string( gitrun, verbose ):
     return val
 
 
+def _symbolic_branch_name( gitrun, verbose ):
+    """
+    Returns the current branch name, or None if HEAD is not on a branch
+    (such as when detached or during a rebase).  This is a single git
+    command, which makes it cheaper than _current_branch_string().
+    """
+    x,out = gitrun.run( 'symbolic-ref -q --short HEAD',
+                        raise_on_error=False, capture=True, verbose=verbose )
+    if x == 0 and out.strip():
+        return out.strip()
+    return None
+
+
 def _rebase_in_progress( gitrun, verbose ):
     ""
     x,out = gitrun.run( 'status', capture=True,
@@ -991,6 +1122,39 @@ def _make_orphan_branch( gitrun, branch, message, pathlist, verbose ):
         shutil.rmtree( tmpdir )
 
 
+def _commit_file_to_branch( gitrun, branch, filename, contents, message,
+                                    verbose ):
+    ""
+    # use a temporary index file so the real index and the working tree
+    # are left alone
+
+    tmpdir = tempfile.mkdtemp( '.gitinterface' )
+    try:
+        blobfile = pjoin( tmpdir, 'contents' )
+        with open( blobfile, 'wt' ) as fp:
+            fp.write( contents )
+
+        x,blob = gitrun.run( 'hash-object -w', quote( blobfile ),
+                             capture=True, verbose=verbose )
+
+        with set_environ( GIT_INDEX_FILE=pjoin( tmpdir, 'index' ) ):
+            gitrun.run( 'read-tree', branch, verbose=verbose )
+            gitrun.run( 'update-index --add --cacheinfo 100644',
+                        blob.strip(), quote( filename ),
+                        verbose=verbose )
+            x,tree = gitrun.run( 'write-tree', capture=True, verbose=verbose )
+
+        x,commit = gitrun.run( 'commit-tree', tree.strip(), '-p', branch,
+                               '-m', quote( message ),
+                               capture=True, verbose=verbose )
+
+        gitrun.run( 'update-ref', 'refs/heads/'+branch, commit.strip(),
+                    verbose=verbose )
+
+    finally:
+        shutil.rmtree( tmpdir )
+
+
 def _create_repo_with_files( gitrun, directory, message, pathL, verbose ):
     ""
     with change_directory( directory ):
@@ -1000,10 +1164,10 @@ def _create_repo_with_files( gitrun, directory, message, pathL, verbose ):
         fL = []
         for pn in pathL:
             fn = _copy_path_to_current_directory( pn )
-            fL.append( pipes.quote(fn) )
+            fL.append( quote(fn) )
 
         gitrun.run( 'add', *fL, chdir=None, verbose=verbose )
-        gitrun.run( 'commit -m', pipes.quote( message ),
+        gitrun.run( 'commit -m', quote( message ),
                     chdir=None, verbose=verbose )
 
 
@@ -5,24 +5,34 @@
 # Government retains certain rights in this software.
 
 import os, sys
+import errno
+import re
 import getopt
 import tempfile
 import shutil
-import filecmp
-import glob
-import pipes
+import subprocess
 from os.path import join as pjoin
 from os.path import abspath, normpath, basename, dirname
 
+try:
+    from shlex import quote
+except Exception:
+    from pipes import quote
+
 import gitinterface as gititf
 from gitinterface import change_directory
+import threadutil
 
 
 MANIFESTS_FILENAME = 'manifests.mrgit'
 GENESIS_FILENAME = 'genesis.map'
 REPOMAP_BRANCH = 'mrgit_repo_map'
 REPOMAP_FILENAME = 'repomap'
-REPOMAP_TEMPFILE = 'repomap.tmp'
+MAX_CONCURRENT_CLONES = 8
+
+# network bound git commands that are run in every repository at once
+CONCURRENT_COMMANDS = [ 'fetch', 'pull' ]
+MAX_CONCURRENT_COMMANDS = 8
 
 
 class MRGitExitError( Exception ):
@@ -46,7 +56,7 @@ def init_cmd( argv, **kwargs ):
 
 def clone_cmd( argv, **kwargs ):
     ""
-    optL,argL = getopt.getopt( argv, 'Gvm:', [] )
+    optL,argL = getopt.getopt( argv, 'Gvm:', [ 'reference=', 'partial' ] )
 
     optD = {}
     for n,v in optL:
@@ -63,7 +73,9 @@ def clone_cmd( argv, **kwargs ):
     if len( argL ) == 0:
         errorexit( 'You must specify a repository to clone.' )
 
-    creator = CloneCreator( optD.get( '-m', None ), verbose=verb )
+    creator = CloneCreator( optD.get( '-m', None ), verbose=verb,
+                            reference=optD.get( '--reference', None ),
+                            partial=( '--partial' in optD ) )
     creator.clone( argL, '-G' in optD )
 
 
@@ -102,10 +114,7 @@ def pull_cmd( argv, **kwargs ):
 
     cfg = load_configuration()
 
-    top = cfg.getTopLevel()
-    for name,path in cfg.getLocalRepoPaths():
-        git = gititf.GitRepo( pjoin( top, path ) )
-        git.run( 'pull', verbose=verb )
+    run_concurrently( cfg, [ 'pull' ], verb )
 
 
 def add_cmd( argv, **kwargs ):
@@ -114,10 +123,10 @@ def add_cmd( argv, **kwargs ):
 
     cfg = load_configuration()
 
-    top = cfg.getTopLevel()
-    for name,path in cfg.getLocalRepoPaths():
-        git = gititf.GitRepo( pjoin( top, path ) )
-        args = [ pipes.quote(arg) for arg in argv ]
+    args = [ quote(arg) for arg in argv ]
+
+    for name,path,abspth in cfg.getLocalRepoAbsPaths():
+        git = cfg.getGitRepo( abspth )
         git.run( 'add', *args, verbose=verb )
 
 
@@ -127,10 +136,9 @@ def status_cmd( argv, **kwargs ):
 
     cfg = load_configuration()
 
-    top = cfg.getTopLevel()
     stats = StatusWriter( verb )
-    for name,path in cfg.getLocalRepoPaths():
-        statD = get_repo_status( name, pjoin( top, path ), verb )
+    for name,path,abspth in cfg.getLocalRepoAbsPaths():
+        statD = get_repo_status( name, cfg.getGitRepo( abspth ), verb )
         stats.add( name, path, statD )
     stats.write( sys.stdout )
 
@@ -141,17 +149,68 @@ def run_cmd( argv, **kwargs ):
 
     cfg = load_configuration()
 
-    top = cfg.getTopLevel()
-    for name,path in cfg.getLocalRepoPaths():
-        git = gititf.GitRepo( pjoin( top, path ) )
+    if argv and argv[0] in CONCURRENT_COMMANDS:
+        run_concurrently( cfg, [ quote(arg) for arg in argv ], verb,
+                          raise_on_error=False, show_repo=True )
+        return
+
+    cmd = ' '.join( [ quote(arg) for arg in argv ] )
+
+    for name,path,abspth in cfg.getLocalRepoAbsPaths():
+        git = cfg.getGitRepo( abspth )
         if verb > 0:
             print3( '\nRepository', repr(name), 'in path', repr(path), '...' )
-        cmd = ' '.join( [ pipes.quote(arg) for arg in argv ] )
         x,out = git.run( cmd, verbose=verb, raise_on_error=False )
         if x != 0 and verb < 3:
             print3( out )
 
 
+def run_concurrently( cfg, gitargs, verbose, raise_on_error=True,
+                                            show_repo=False ):
+    """
+    Runs the same git command in each repository, with several running at
+    the same time.  When they are all done, the output of each is printed
+    in repository order.
+    """
+    repos = list( cfg.getLocalRepoAbsPaths() )
+    gits = [ cfg.getGitRepo( abspth ) for name,path,abspth in repos ]
+
+    def run_git( git ):
+        bgcmd = git.start( *gitargs )
+        x,out = bgcmd.wait()
+        return bgcmd,x,out
+
+    resultL = threadutil.map_with_threads( run_git, gits,
+                                           MAX_CONCURRENT_COMMANDS )
+
+    failed = []
+
+    for (name,path,abspth),(bgcmd,x,out) in zip( repos, resultL ):
+
+        if show_repo and verbose > 0:
+            print3( '\nRepository', repr(name), 'in path', repr(path), '...' )
+        print_command_result( bgcmd, x, out, verbose )
+
+        if x != 0:
+            failed.append( name )
+
+    if failed and raise_on_error:
+        errorexit( 'git', gitargs[0], 'failed in', ', '.join( failed ) )
+
+
+def print_command_result( bgcmd, x, out, verbose ):
+    """
+    Prints the command and its output similar to gitinterface.runcmd().
+    """
+    if verbose >= 2:
+        print3( 'cd', bgcmd.getDirectory(), '\n'+bgcmd.getCommand() )
+    elif verbose == 1:
+        print3( bgcmd.getCommand() )
+
+    if out.strip() and ( verbose >= 3 or x != 0 ):
+        print3( out.rstrip() )
+
+
 def load_configuration():
     ""
     cfg = Configuration()
@@ -178,12 +237,32 @@ def load_configuration():
     return cfg
 
 
+# maps ( cwd, repodir, barrier ) to a top level directory found previously
+toplevel_cache = {}
+
 def find_top_level( repodir ):
+    """
+    Searches the current directory and its parents for 'repodir'.  A found
+    top level is remembered, and only needs one stat to confirm next time.
+    """
+    stopat = os.environ.get( 'MRGIT_PARENT_SEARCH_BARRIER', '/' )
+    cwd = os.getcwd()
+
+    key = ( cwd, repodir, stopat )
+    top = toplevel_cache.get( key, None )
+
+    if top == None or not os.path.isdir( pjoin( top, repodir ) ):
+        top = search_for_top_level( cwd, repodir, stopat )
+        if top:
+            toplevel_cache[ key ] = top
+
+    return top
+
+
+def search_for_top_level( d1, repodir, stopat ):
     ""
     top = None
-    stopat = os.environ.get( 'MRGIT_PARENT_SEARCH_BARRIER', '/' )
 
-    d1 = os.getcwd()
     while True:
         if os.path.isdir( pjoin( d1, repodir ) ):
             top = d1
@@ -242,10 +321,12 @@ def make_absolute_url_path( url ):
 
 class CloneCreator:
 
-    def __init__(self, groupname=None, verbose=1):
+    def __init__(self, groupname=None, verbose=1, reference=None,
+                                                   partial=False):
         ""
         self.grpname = groupname
         self.verbose = verbose
+        self.cloneflags = gititf.clone_flags( reference, partial )
 
     def clone(self, url_list, is_google_manifest=False):
         ""
@@ -396,7 +477,7 @@ class CloneCreator:
         if os.path.exists( newtop ) and not os.path.samefile( top, newtop ):
             check_nonempty_destination_paths( newtop, cfg.getLocalRepoPaths() )
 
-        clone_repositories_from_config( cfg, self.verbose )
+        clone_repositories_from_config( cfg, self.verbose, self.cloneflags )
 
         make_mrgit_repo( cfg, self.verbose )
 
@@ -532,12 +613,14 @@ class GoogleConverter:
         self.default.createRepoNameToURLMap()
 
         self.manifests = []
-        for fn in glob.glob( pjoin( self.srcdir, '*.xml' ) ):
-            if basename(fn) != 'default.xml':
-                gmr = GoogleManifestReader( fn )
+        for fn in list_manifest_files( self.srcdir ):
+            if fn != 'default.xml':
+                gmr = GoogleManifestReader( pjoin( self.srcdir, fn ) )
                 gmr.createRepoNameToURLMap()
                 self.manifests.append( gmr )
 
+        self.primary = self._compute_primary_urls()
+
     def fillRepoMap(self, rmap):
         ""
         for gmr in [ self.default ] + self.manifests:
@@ -552,15 +635,7 @@ class GoogleConverter:
         the one specified in the defaults.xml, or if not there then it is
         the most common one in all of the manifest XML files.
         """
-        url = self.default.getRepoURL( repo_name, None )
-
-        if not url:
-            url2cnt = self._count_urls( repo_name )
-            sortL = [ (T[1],T[0]) for T in url2cnt.items() ]
-            sortL.sort()
-            url = sortL[-1][1]
-
-        return url
+        return self.primary[ repo_name ]
 
     def getDefaultGroupName(self):
         ""
@@ -598,16 +673,35 @@ class GoogleConverter:
 
         return True
 
-    def _count_urls(self, repo_name):
+    def _compute_primary_urls(self):
         ""
-        url2cnt = {}
-
+        name2cnts = {}
         for mfest in self.manifests:
-            url = mfest.getRepoURL( repo_name, None )
-            if url:
+            for name,url,path in mfest.getProjectList():
+                url2cnt = name2cnts.setdefault( name, {} )
                 url2cnt[ url ] = url2cnt.get( url, 0 ) + 1
 
-        return url2cnt
+        primary = {}
+
+        for name,url2cnt in name2cnts.items():
+            sortL = [ (T[1],T[0]) for T in url2cnt.items() ]
+            sortL.sort()
+            primary[ name ] = sortL[-1][1]
+
+        for name,url,path in self.default.getProjectList():
+            primary[ name ] = url
+
+        return primary
+
+
+def list_manifest_files( directory ):
+    """
+    Returns the sorted list of *.xml file names in the given directory.
+    """
+    fL = [ fn for fn in os.listdir( directory )
+                if fn.endswith( '.xml' ) and not fn.startswith( '.' ) ]
+    fL.sort()
+    return fL
 
 
 class GoogleManifestReader:
@@ -620,23 +714,22 @@ class GoogleManifestReader:
 
         self.name = os.path.splitext( basename( filename ) )[0]
         self.urlmap = {}
+        self.projects = []
 
-        self.xmlroot = ET.parse( filename ).getroot()
+        xmlroot = ET.parse( filename ).getroot()
+        self._read_xml_nodes( xmlroot )
 
     def createRepoNameToURLMap(self):
         ""
         self.urlmap = {}
+        self.projects = []
 
-        self.default_remote = self._get_default_remote_name()
-        self.remotes = self._collect_remote_prefix_urls()
-
-        for nd in self.xmlroot:
-            if nd.tag == 'project':
-                url = self._get_project_url( nd )
-                name = self._get_project_name( nd )
+        for name,remote,path in self.xmlprojects:
+            url = self._get_project_url( name, remote )
 
-                assert name not in self.urlmap
-                self.urlmap[name] = url
+            assert name not in self.urlmap
+            self.urlmap[name] = url
+            self.projects.append( ( name, url, path ) )
 
         return self.urlmap
 
@@ -655,40 +748,39 @@ class GoogleManifestReader:
         return self.urlmap[repo_name]
 
     def getProjectList(self):
-        ""
-        projects = []
-
-        for nd in self.xmlroot:
-            if nd.tag == 'project':
-                name = self._get_project_name( nd )
-                url = self.urlmap[ name ]
-                path = self._get_project_path( nd )
-
-                projects.append( ( name, url, path ) )
-
-        return projects
-
-    def _collect_remote_prefix_urls(self):
-        ""
-        remotes = {}
-
-        for nd in self.xmlroot:
-            if nd.tag == 'remote':
-                name = nd.attrib['name'].strip()
-                prefix = nd.attrib['fetch'].strip()
-                remotes[name] = prefix
-
-        return remotes
-
-    def _get_project_name(self, xmlnd):
-        ""
-        return xmlnd.attrib['name'].strip()
+        """
+        Returns a list of ( name, url, path ) for each project.  Must call
+        createRepoNameToURLMap() first.
+        """
+        return self.projects
 
-    def _get_project_url(self, xmlnd):
-        ""
-        name = self._get_project_name( xmlnd )
-        remote = xmlnd.attrib.get( 'remote', self.default_remote ).strip()
-        prefix = self.remotes[remote]
+    def _read_xml_nodes(self, xmlroot):
+        """
+        Collects the remote, default, and project information, letting
+        ElementTree select the child nodes by tag name.
+        """
+        self.remotes = {}
+        for nd in xmlroot.iterfind( 'remote' ):
+            name = nd.attrib['name'].strip()
+            self.remotes[name] = nd.attrib['fetch'].strip()
+
+        self.default_remote = None
+        nd = xmlroot.find( 'default' )
+        if nd != None:
+            self.default_remote = nd.attrib['remote'].strip()
+
+        self.xmlprojects = []
+        for nd in xmlroot.iterfind( 'project' ):
+            name = nd.attrib['name'].strip()
+            remote = nd.attrib.get( 'remote', None )
+            path = self._get_project_path( nd )
+            self.xmlprojects.append( ( name, remote, path ) )
+
+    def _get_project_url(self, name, remote):
+        ""
+        if remote == None:
+            remote = self.default_remote
+        prefix = self.remotes[ remote.strip() ]
         url = append_path_to_url( prefix, name )
 
         return url
@@ -701,12 +793,6 @@ class GoogleManifestReader:
 
         return path
 
-    def _get_default_remote_name(self):
-        ""
-        for nd in self.xmlroot:
-            if nd.tag == 'default':
-                return nd.attrib['remote'].strip()
-
 
 def set_google_repo_manifest( cfg, repodir ):
     ""
@@ -803,45 +889,163 @@ def path_for_toplevel( cfg, remotename ):
     return top
 
 
-def clone_repositories_from_config( cfg, verbose=2 ):
-    ""
+def clone_repositories_from_config( cfg, verbose=2, cloneflags='' ):
+    """
+    The 'cloneflags' are extra "git clone" options, such as those produced
+    by gitinterface.clone_flags().
+    """
     topdir = cfg.getTopLevel()
 
     check_make_directory( topdir )
 
-    with change_directory( topdir ):
-        for url,loc in cfg.getActiveRepoList():
-            if not os.path.exists( loc+'/.git' ):
-                robust_clone( url, loc, verbose )
+    cloner = ConcurrentCloner( topdir, verbose, cloneflags )
 
+    for url,loc in cfg.getActiveRepoList():
+        if not os.path.exists( pjoin( topdir, loc, '.git' ) ):
+            cloner.add( url, loc )
 
-def robust_clone( url, into_dir, verbose=2 ):
-    ""
-    tmp = None
+    cloner.run()
 
-    if verbose > 0:
-        verbose = 3
 
-    try:
-        if os.path.exists( into_dir ):
+class ConcurrentCloner:
+    """
+    Runs "git clone" subprocesses concurrently.  The clones are done in
+    waves, where a repository nested inside another repository's path is
+    not started until the enclosing repository has been cloned.
 
-            assert '.git' not in os.listdir( into_dir )
+    Each subprocess is started with its own working directory, so the
+    current directory of this process is never changed.
+    """
 
-            tmp = tempfile.mkdtemp( '', 'mrgit_tempclone_', abspath( into_dir ) )
-            gititf.clone_repo( url, tmp, verbose=verbose )
-            move_directory_contents( tmp, into_dir )
+    def __init__(self, topdir, verbose=2, cloneflags='',
+                       maxconcurrent=MAX_CONCURRENT_CLONES):
+        ""
+        self.topdir = topdir
+        self.verbose = verbose
+        self.flags = cloneflags
+        self.maxrun = maxconcurrent
+        self.clones = []
+
+    def add(self, url, loc):
+        ""
+        self.clones.append( ( url, normpath( loc ) ) )
+
+    def run(self):
+        ""
+        for wave in self._nesting_waves():
+            self._clone_wave( wave )
+
+    def _nesting_waves(self):
+        ""
+        locs = [ loc for url,loc in self.clones ]
+
+        waves = {}
+        for url,loc in self.clones:
+            depth = len( [ L for L in locs if is_subpath( L, loc ) ] )
+            waves.setdefault( depth, [] ).append( ( url, loc ) )
+
+        return [ waves[depth] for depth in sorted( waves.keys() ) ]
+
+    def _clone_wave(self, wave):
+        """
+        Once a clone fails, no more clones in the wave are started.
+        """
+        failed = []
 
-            git = gititf.GitRepo( into_dir )
+        def clone( url_loc ):
+            if len( failed ) > 0:
+                return None
+            bclone = self._start_clone( *url_loc )
+            if not bclone.wait():
+                failed.append( bclone )
+            return bclone
 
+        cloneL = threadutil.map_with_threads( clone, wave, self.maxrun )
+
+        firstfail = None
+        for bclone in cloneL:
+            if bclone is not None:
+                if not bclone.finish( self.verbose ) and firstfail is None:
+                    firstfail = bclone
+
+        if firstfail:
+            raise MRGitExitError( 'clone failed for '+firstfail.url )
+
+    def _start_clone(self, url, loc):
+        ""
+        clone = BackgroundClone( url, pjoin( self.topdir, loc ) )
+        clone.start( self.topdir, self.flags, self.verbose )
+        return clone
+
+
+class BackgroundClone:
+
+    def __init__(self, url, into_dir):
+        ""
+        self.url = url
+        self.into_dir = into_dir
+        self.tmp = None
+
+    def start(self, rundir, cloneflags, verbose):
+        ""
+        if os.path.exists( self.into_dir ):
+            # clone into a temporary subdirectory, then move the contents
+            assert '.git' not in os.listdir( self.into_dir )
+            self.tmp = tempfile.mkdtemp( '', 'mrgit_tempclone_',
+                                         abspath( self.into_dir ) )
+            dest = self.tmp
         else:
-            git = gititf.clone_repo( url, into_dir, verbose=verbose )
+            dest = self.into_dir
 
-    except gititf.GitInterfaceError:
-        if tmp:
-            shutil.rmtree( tmp )
-        raise MRGitExitError( 'clone failed for '+url )
+        self.cmd = 'git clone'+cloneflags+' '+quote( self.url ) + \
+                                         ' '+quote( dest )
+        if verbose > 0:
+            print3( 'cd', rundir, '\n'+self.cmd )
 
-    return git
+        self.outfp = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen( self.cmd, shell=True, cwd=rundir,
+                                      stdout=self.outfp,
+                                      stderr=subprocess.STDOUT )
+
+    def wait(self):
+        """
+        Waits for the clone subprocess to exit, and returns True if it exited
+        with a zero status.
+        """
+        return self.proc.wait() == 0
+
+    def finish(self, verbose):
+        """
+        Returns True if the clone was successful.
+        """
+        self.outfp.seek(0)
+        out = self.outfp.read()
+        if sys.version_info[0] > 2: out = out.decode( errors='replace' )
+        self.outfp.close()
+
+        ok = ( self.proc.returncode == 0 )
+
+        if out.strip() and ( verbose > 0 or not ok ):
+            print3( out.rstrip() )
+
+        if ok and self.tmp:
+            move_directory_contents( self.tmp, self.into_dir )
+        elif self.tmp and os.path.exists( self.tmp ):
+            shutil.rmtree( self.tmp )
+
+        return ok
+
+
+def is_subpath( parent, path ):
+    """
+    True if relative path 'path' is strictly inside relative path 'parent'.
+    """
+    if parent == path:
+        return False
+    elif parent == '.':
+        return True
+    else:
+        return path.startswith( parent+os.sep )
 
 
 def temp_clone( url, chdir, verbose=1 ):
@@ -907,14 +1111,30 @@ def move_directory_contents( fromdir, todir ):
     ""
     if os.path.exists( todir ):
         for fn in os.listdir( fromdir ):
-            frompath = pjoin( fromdir, fn )
-            shutil.move( frompath, todir )
+            move_path( pjoin( fromdir, fn ), pjoin( todir, fn ) )
         shutil.rmtree( fromdir )
 
     else:
         os.rename( fromdir, todir )
 
 
+def move_path( frompath, topath ):
+    """
+    A rename is a single system call; shutil.move() is only needed when the
+    paths are on different file systems.  Like shutil.move() into a
+    directory, an existing destination is an error rather than replaced.
+    """
+    if os.path.exists( topath ):
+        raise shutil.Error( "Destination path '"+topath+"' already exists" )
+
+    try:
+        os.rename( frompath, topath )
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move( frompath, topath )
+
+
 def check_make_directory( path ):
     ""
     if path and not os.path.isdir( path ):
@@ -940,6 +1160,9 @@ class Configuration:
         self.remote = RepoMap()
         self.inactive = set()
 
+        self.abspaths = None  # ( cache key, list of absolute paths )
+        self.gitrepos = {}  # path to GitRepo object
+
     def setTopLevel(self, directory):
         ""
         self.topdir = directory
@@ -983,6 +1206,40 @@ class Configuration:
 
         return paths
 
+    def getLocalRepoAbsPaths(self):
+        """
+        Same as getLocalRepoPaths() but with a third entry in each tuple, the
+        absolute path to the repository.  The list is computed once for a
+        given top level directory, manifest group name, and manifests content.
+        """
+        key = ( self.topdir, self.grpname,
+                self.mfest, self.mfest.getChangeCount() )
+
+        if self.abspaths == None or self.abspaths[0] != key:
+
+            top = abspath( self.topdir )
+            repos = [ ( name, path, normpath( pjoin( top, path ) ) )
+                      for name,path in self.getLocalRepoPaths() ]
+
+            self.abspaths = ( key, repos )
+
+        return self.abspaths[1]
+
+    def getGitRepo(self, path):
+        """
+        Returns a GitRepo object for the repository at 'path'.  The object is
+        created once for each path, which avoids running git again to find
+        the repository top level.
+        """
+        path = abspath( path )
+
+        git = self.gitrepos.get( path, None )
+        if git == None:
+            git = gititf.GitRepo( path )
+            self.gitrepos[ path ] = git
+
+        return git
+
     def getActiveRepoList(self):
         ""
         repolist = []
@@ -1013,14 +1270,9 @@ class Configuration:
             for spec in grp.getRepoList():
                 local.setRepoLocation( spec['repo'], path=spec['path'] )
 
-        mrgit = pjoin( self.topdir, '.mrgit' )
-        git = gititf.GitRepo( mrgit )
-        checkout_repo_map_branch( git )
+        git = self.getGitRepo( pjoin( self.topdir, '.mrgit' ) )
 
-        try:
-            write_mrgit_repo_map_file( local, git )
-        finally:
-            git.checkout_branch( 'master' )
+        write_mrgit_repo_map_file( local, git )
 
 
 def make_mrgit_repo( cfg, verbose=2):
@@ -1044,6 +1296,7 @@ class Manifests:
     def __init__(self):
         ""
         self.groups = []  # order matters - the first group is the default
+        self.changes = 0  # incremented each time a repo is added or changed
 
     def addRepo(self, groupname, reponame, path):
         ""
@@ -1052,6 +1305,11 @@ class Manifests:
             grp = RepoGroup( groupname )
             self.groups.append( grp )
         grp.setRepo( reponame, path )
+        self.changes += 1
+
+    def getChangeCount(self):
+        ""
+        return self.changes
 
     def getDefaultGroup(self):
         ""
@@ -1074,15 +1332,16 @@ class Manifests:
 
     def writeToFile(self, filename):
         ""
-        with open( filename, 'wt' ) as fp:
-            for grp in self.groups:
-                fp.write( '[ group '+grp.getName()+' ]\n' )
-                for spec in grp.getRepoList():
-                    fp.write( '    repo='+spec['repo'] )
-                    fp.write( ', path='+spec['path'] )
-                    fp.write( '\n' )
+        lines = []
 
-                fp.write( '\n' )
+        for grp in self.groups:
+            lines.append( '[ group '+grp.getName()+' ]' )
+            for spec in grp.getRepoList():
+                lines.append( '    repo='+spec['repo']+', path='+spec['path'] )
+            lines.append( '' )
+
+        with open( filename, 'wt' ) as fp:
+            fp.write( ''.join( [ line+'\n' for line in lines ] ) )
 
     def readFromFile(self, filename):
         ""
@@ -1092,9 +1351,9 @@ class Manifests:
 
             for line in fp:
                 line = line.strip()
-                if line.startswith( '#' ):
+                if not line or line[0] == '#':
                     pass
-                elif line.startswith( '[' ):
+                elif line[0] == '[':
                     groupname = self._parse_group_name( line )
                 elif groupname != None:
                     attrs = parse_attribute_line( line )
@@ -1102,17 +1361,17 @@ class Manifests:
                         self.addRepo( groupname, attrs['repo'], attrs['path'] )
 
     def _parse_group_name(self, line):
-        ""
-        groupname = None
+        """
+        Returns the name in a "[ group <name> ]" line, which may be empty,
+        or None if the line is not a group line.
+        """
+        mat = group_line_pattern.match( line )
+        if mat:
+            return mat.group(1)
+        return None
 
-        sL = line.strip('[').strip(']').strip().split()
-        if len(sL) > 0 and sL[0] == 'group':
-            if len(sL) > 1:
-                groupname = sL[1]
-            else:
-                groupname = ''
 
-        return groupname
+group_line_pattern = re.compile( r'\[+\s*group(?=[\s\]]|$)\s*([^\s\]]*)' )
 
 
 class RepoGroup:
@@ -1121,6 +1380,7 @@ class RepoGroup:
         ""
         self.name = groupname
         self.repos = []
+        self.index = {}  # repo name to spec (same objects as in self.repos)
 
     def getName(self):
         ""
@@ -1136,15 +1396,12 @@ class RepoGroup:
         if spec == None:
             spec = { 'repo':reponame }
             self.repos.append( spec )
+            self.index[ reponame ] = spec
         spec['path'] = path
 
     def findRepo(self, reponame):
         ""
-        for spec in self.repos:
-            if spec['repo'] == reponame:
-                return spec
-
-        return None
+        return self.index.get( reponame, None )
 
     def getRepoNames(self):
         ""
@@ -1174,35 +1431,47 @@ class RepoMap:
     def writeToFile(self, filename):
         ""
         with open( filename, 'wt' ) as fp:
-            for name,loc in self.repomap.items():
-                fp.write( 'repo='+name )
-                if loc[0]:
-                    fp.write( ', url='+loc[0] )
-                if loc[1]:
-                    fp.write( ', path='+loc[1] )
-                fp.write( '\n' )
+            fp.write( self.writeToString() )
+
+    def writeToString(self):
+        ""
+        lines = []
 
-            fp.write( '\n' )
+        for name,loc in self.repomap.items():
+            line = 'repo='+name
+            if loc[0]:
+                line += ', url='+loc[0]
+            if loc[1]:
+                line += ', path='+loc[1]
+            lines.append( line )
+
+        lines.append( '' )
+
+        return ''.join( [ line+'\n' for line in lines ] )
 
     def readFromFile(self, filename, baseurl=None):
         ""
         with open( filename, 'rt' ) as fp:
+            self._read_lines( fp, baseurl )
 
-            for line in fp:
-                line = line.strip()
+    def readFromString(self, text, baseurl=None):
+        ""
+        self._read_lines( text.splitlines(), baseurl )
 
-                if line.startswith('#'):
-                    pass
+    def _read_lines(self, lines, baseurl):
+        ""
+        for line in lines:
+            line = line.strip()
 
-                elif line:
-                    attrs = parse_attribute_line( line )
-                    if 'repo' in attrs:
-                        if 'url' in attrs:
-                            url = attrs['url']
-                        else:
-                            url = append_path_to_url( baseurl, attrs['path'] )
+            if line and line[0] != '#':
+                attrs = parse_attribute_line( line )
+                if 'repo' in attrs:
+                    if 'url' in attrs:
+                        url = attrs['url']
+                    else:
+                        url = append_path_to_url( baseurl, attrs['path'] )
 
-                        self.setRepoLocation( attrs['repo'], url=url )
+                    self.setRepoLocation( attrs['repo'], url=url )
 
 
 def append_path_to_url( url, path ):
@@ -1217,15 +1486,17 @@ def append_path_to_url( url, path ):
         return pjoin( url, path )
 
 
+# a comma separated list of key=value, where the value may contain '='
+attribute_pattern = re.compile( r'([^,=]*)=([^,]*)' )
+
 def parse_attribute_line( line ):
     ""
     attrs = {}
 
-    kvL = [ s.strip() for s in line.split(',') ]
-    for kvstr in kvL:
-        kv = [ s.strip() for s in kvstr.split( '=', 1 ) ]
-        if len(kv) == 2 and kv[0]:
-            attrs[ kv[0] ] = kv[1]
+    for key,val in attribute_pattern.findall( line ):
+        key = key.strip()
+        if key:
+            attrs[ key ] = val.strip()
 
     return attrs
 
@@ -1267,13 +1538,17 @@ def commit_mrgit_manifests_file( manifests, git, verbose=2 ):
 
 def read_mrgit_repo_map_file( repomap, baseurl, git ):
     ""
-    git.checkout_branch( REPOMAP_BRANCH )
+    if REPOMAP_BRANCH in git.get_branches():
+        ref = REPOMAP_BRANCH
+    else:
+        ref = 'origin/'+REPOMAP_BRANCH
 
-    try:
-        with change_directory( git.get_toplevel() ):
-            repomap.readFromFile( REPOMAP_FILENAME, baseurl )
-    finally:
-        git.checkout_branch( 'master' )
+    text = git.get_file_contents( ref, REPOMAP_FILENAME )
+    if text == None:
+        errorexit( 'repository map file', repr(REPOMAP_FILENAME),
+                   'not found on branch', repr(ref) )
+
+    repomap.readFromString( text, baseurl )
 
 
 def read_genesis_map_file( repomap, git ):
@@ -1287,35 +1562,34 @@ def read_genesis_map_file( repomap, git ):
 
 
 def write_mrgit_repo_map_file( repomap, git ):
-    ""
-    with change_directory( git.get_toplevel() ):
-
-        if os.path.exists( REPOMAP_FILENAME ):
-            repomap.writeToFile( REPOMAP_TEMPFILE )
-            commit_repo_map_file_if_changed( git )
+    """
+    The map file is committed to the repo map branch without checking out
+    that branch.
+    """
+    create_repo_map_branch( git )
 
-        else:
-            repomap.writeToFile( REPOMAP_FILENAME )
-            git.add( REPOMAP_FILENAME )
-            git.commit( 'init '+REPOMAP_FILENAME )
+    newtext = repomap.writeToString()
+    oldtext = git.get_file_contents( REPOMAP_BRANCH, REPOMAP_FILENAME )
 
+    if oldtext == None:
+        git.commit_file_to_branch( REPOMAP_BRANCH, REPOMAP_FILENAME,
+                                   newtext, 'init '+REPOMAP_FILENAME )
 
-def commit_repo_map_file_if_changed( git ):
-    ""
-    if filecmp.cmp( REPOMAP_FILENAME, REPOMAP_TEMPFILE ):
-        os.remove( REPOMAP_TEMPFILE )
-    else:
-        os.rename( REPOMAP_TEMPFILE, REPOMAP_FILENAME )
-        git.add( REPOMAP_FILENAME )
-        git.commit( 'changed '+REPOMAP_FILENAME )
+    elif oldtext != newtext:
+        git.commit_file_to_branch( REPOMAP_BRANCH, REPOMAP_FILENAME,
+                                   newtext, 'changed '+REPOMAP_FILENAME )
 
 
-def checkout_repo_map_branch( git ):
-    ""
-    if REPOMAP_BRANCH in git.get_branches():
-        git.checkout_branch( REPOMAP_BRANCH )
-    else:
-        git.create_branch( REPOMAP_BRANCH )
+def create_repo_map_branch( git ):
+    """
+    Creates the local repo map branch if it does not already exist, tracking
+    the remote one if the remote has it.  The current branch is unchanged.
+    """
+    if REPOMAP_BRANCH not in git.get_branches():
+        if REPOMAP_BRANCH in git.get_branches( remotes=True ):
+            git.run( 'branch --track', REPOMAP_BRANCH, 'origin/'+REPOMAP_BRANCH )
+        else:
+            git.run( 'branch', REPOMAP_BRANCH )
 
 
 def set_to_ignore_mrgit_directory( cfg ):
@@ -1350,10 +1624,8 @@ def file_has_line( filename, line ):
     return False
 
 
-def get_repo_status( name, path, verbose ):
+def get_repo_status( name, git, verbose ):
     ""
-    git = gititf.GitRepo( path )
-
     if verbose > 0:
         if verbose >= 3:
             print3()
@@ -11,6 +11,10 @@ import os
 import stat
 import re
 import tempfile
+import threading
+from collections import deque
+
+from threadutil import make_worker_pool
 
 
 class PermissionSpecificationError( Exception ):
@@ -20,7 +24,8 @@ class PermissionSpecificationError( Exception ):
 def apply( path, *stringspecs, **kwargs ):
     """
     Parse and apply group and/or file mode specifications to a path. The
-    only known keyword argument is 'recurse' which defaults to False.
+    known keyword arguments are 'recurse', which defaults to False, and
+    'workers', the number of threads used to change files (default 1).
     Examples:
 
         apply( 'some/path', '+rX', recurse=True )
@@ -31,12 +36,13 @@ def apply( path, *stringspecs, **kwargs ):
     directories.
     """
     recurse = kwargs.pop( 'recurse', False )
+    workers = kwargs.pop( 'workers', 1 )
     if len( kwargs ) > 0:
         raise PermissionSpecificationError(
                             'unknown keyword arguments: '+repr(kwargs) )
 
     specs = PermissionSpecifications( *stringspecs )
-    specs.apply( path, recurse=recurse )
+    specs.apply( path, recurse=recurse, workers=workers )
 
 
 def my_user_name():
@@ -115,20 +121,57 @@ class PermissionSpecifications:
     def __init__(self, *stringspecs):
         ""
         self.specs = []
-        for sspec in split_specs_by_commas( stringspecs ):
-            self.specs.append( parse_string_spec(sspec) )
 
-    def apply(self, path, recurse=False):
+        sL = split_specs_by_commas( stringspecs )
+        if len( sL ) > 0:
+            umask = get_umask()
+            self.specs.extend( parse_string_specs_cached( sL, umask ) )
+
+    def apply(self, path, recurse=False, workers=1):
+        """
+        If 'workers' is greater than one, files are changed by that many
+        threads while the directories are walked (and changed) serially.
+        """
+        pool = make_worker_pool( workers )
+        try:
+            mode,uid = lstat_mode_and_owner( path )
+            self._apply_path( path, mode, uid, recurse, pool )
+        finally:
+            pool.wait()
+
+    def _apply_path(self, path, mode, uid, recurse, pool):
         ""
-        if not os.path.islink( path ):
+        if stat.S_ISDIR( mode ):
 
-            for spec in self.specs:
-                spec.apply( path )
+            self._apply_specs( path, mode, uid )
 
-            if recurse and os.path.isdir( path ):
+            if recurse:
                 for fn in os.listdir( path ):
                     fp = os.path.join( path, fn )
-                    self.apply( fp, recurse )
+                    fmode,fuid = lstat_mode_and_owner( fp )
+                    self._apply_path( fp, fmode, fuid, recurse, pool )
+
+        elif not stat.S_ISLNK( mode ):
+            pool.submit( self._apply_specs, path, mode, uid )
+
+    def _apply_specs(self, path, mode, uid):
+        ""
+        for spec in self.specs:
+            mode = spec.apply( path, mode, uid )
+
+
+def lstat_mode_and_owner( path ):
+    """
+    Returns the st_mode and st_uid of 'path' without following soft links,
+    or zero and None if the path does not exist. A single lstat answers the
+    "is it a link" and "is it a directory" questions and provides what the
+    specs need to change the path without another stat.
+    """
+    try:
+        st = os.lstat( path )
+    except OSError:
+        return 0,None
+    return st.st_mode, st.st_uid
 
 
 def split_specs_by_commas( stringspecs ):
@@ -153,12 +196,17 @@ class PermSpec:
         self.xbits = 0
         self.dbits = 0
 
-    def apply(self, path):
-        ""
-        md = os.stat(path)[stat.ST_MODE]
-
-        isdir = stat.S_ISDIR( md )
-        fm = stat.S_IMODE( md )
+    def apply(self, path, mode=None, uid=None):
+        """
+        If 'mode' is given, it must be the current st_mode of 'path'. Returns
+        the st_mode after the change. The 'uid' is not used.
+        """
+        if not mode:
+            mode = os.stat(path)[stat.ST_MODE]
+
+        isdir = stat.S_ISDIR( mode )
+        fm = stat.S_IMODE( mode )
+        curfm = fm
         xval = (fm & (stat.S_IXUSR|stat.S_IXGRP|stat.S_IXOTH) )
 
         fm &= ( ~(self.bitsoff) )
@@ -168,7 +216,10 @@ class PermSpec:
         if isdir:
             fm |= self.dbits
 
-        os.chmod( path, fm )
+        if fm != curfm:
+            os.chmod( path, fm )
+
+        return stat.S_IFMT( mode ) | fm
 
 
 class GroupSpec:
@@ -177,9 +228,13 @@ class GroupSpec:
         ""
         self.groupid = groupid
 
-    def apply(self, path):
-        ""
-        uid = os.stat( path ).st_uid
+    def apply(self, path, mode=None, uid=None):
+        """
+        If 'uid' is given, it must be the owner of 'path'. Returns None
+        because changing the group can clear the set-id bits.
+        """
+        if uid == None:
+            uid = os.stat( path ).st_uid
         os.chown( path, uid, self.groupid )
 
 
@@ -212,8 +267,29 @@ bit_map = {
 }
 
 
-def parse_string_spec( strspec ):
-    ""
+parsed_specs_cache = {}
+
+def parse_string_specs_cached( stringspecs, umask ):
+    """
+    Returns a tuple of parse_string_spec() results for the list of string
+    specs. The spec objects are not modified after parsing, so the results
+    are cached and shared (parsing a group spec probes the file system).
+    """
+    key = ( tuple( stringspecs ), umask )
+
+    specs = parsed_specs_cache.get( key, None )
+    if specs == None:
+        specs = tuple( [ parse_string_spec( s, umask ) for s in stringspecs ] )
+        parsed_specs_cache[ key ] = specs
+
+    return specs
+
+
+def parse_string_spec( strspec, umask=None ):
+    """
+    The 'umask' is only used for mode specs without a "who" prefix; if None,
+    the process umask is read when needed.
+    """
     who = ''
     op = ''
     what = ''
@@ -235,21 +311,22 @@ def parse_string_spec( strspec ):
         i += 1
 
     if op and check_bit_letters(what):
-        spec = create_change_mode_spec( who, op, what )
+        spec = create_change_mode_spec( who, op, what, umask )
     else:
         spec = parse_group_string_spec( strspec )
 
     return spec
 
 
-def create_change_mode_spec( who, op, what ):
+def create_change_mode_spec( who, op, what, umask=None ):
     ""
     spec = PermSpec()
 
     if who:
         umask = 0
     else:
-        umask = get_umask()
+        if umask == None:
+            umask = get_umask()
         who = 'ugo'
 
     for w in who:
@@ -283,41 +360,88 @@ def parse_group_string_spec( strspec ):
         gid = int( strspec )
     except Exception:
         try:
-            import grp
-            gid = grp.getgrnam( strspec ).gr_gid
+            gid = group_id_for_name( strspec )
         except Exception:
             raise PermissionSpecificationError(
                     'Invalid specification or group name: "'+strspec+'"' )
 
     spec = GroupSpec( gid )
 
-    # check that a path can be changed to the given group
-    tmpd = tempfile.mkdtemp()
-    try:
-        try:
-            spec.apply( tmpd )
-        except Exception:
-            raise PermissionSpecificationError(
-                    'Invalid specification or group name: "'+strspec+'"' )
-    finally:
-        os.rmdir( tmpd )
+    if not can_change_to_group( spec ):
+        raise PermissionSpecificationError(
+                'Invalid specification or group name: "'+strspec+'"' )
 
     return spec
 
 
+changeable_group_ids = set()
+
+def can_change_to_group( spec ):
+    """
+    True if files can be changed to the group of the given GroupSpec. Groups
+    the process belongs to are assumed okay; otherwise (such as when running
+    as root) a temporary directory is used as a probe. Successes are cached.
+    """
+    gid = spec.groupid
+
+    if gid not in changeable_group_ids:
+
+        if gid == os.getegid() or gid in os.getgroups():
+            changeable_group_ids.add( gid )
+
+        else:
+            tmpd = tempfile.mkdtemp()
+            try:
+                try:
+                    spec.apply( tmpd )
+                except Exception:
+                    return False
+            finally:
+                os.rmdir( tmpd )
+
+            changeable_group_ids.add( gid )
+
+    return True
+
+
+group_id_cache = {}
+
+def group_id_for_name( group_name ):
+    """
+    Returns the numeric group id of the given group name. The group database
+    lookup can be slow (LDAP, etc), so successful lookups are cached. Unknown
+    names raise KeyError every time.
+    """
+    gid = group_id_cache.get( group_name, None )
+
+    if gid == None:
+        import grp
+        gid = grp.getgrnam( group_name ).gr_gid
+        group_id_cache[ group_name ] = gid
+
+    return gid
+
+
+bit_letters = frozenset( 'rwxXsSt' )
+
 def check_bit_letters( what ):
     ""
-    for c in what:
-        if c not in 'rwxXsSt':
-            return False
+    return bit_letters.issuperset( what )
 
-    return True
 
+umask_lock = threading.Lock()
 
 def get_umask():
-    ""
-    msk = os.umask(0)
-    os.umask( msk )
+    """
+    The umask can only be read by setting it, so the read-and-restore is
+    done under a lock to keep two threads from interleaving.
+    """
+    umask_lock.acquire()
+    try:
+        msk = os.umask(0)
+        os.umask( msk )
+    finally:
+        umask_lock.release()
     return msk
 
 
@@ -325,6 +449,8 @@ def get_umask():
 
 # functions below here are deprecated
 
+access_flags = { 'read':os.R_OK, 'write':os.W_OK, 'execute':os.X_OK }
+
 def permission( path_or_fmode, which ):
     """
     Answers a permissions question about the given file name (a string) or
@@ -346,27 +472,15 @@ def permission( path_or_fmode, which ):
     If a minus sign is in the <mode> then an exact match of the file mode
     must be true for this function to return True.
     """
-    if which == 'read':
-        if type(path_or_fmode) != type(''):
-            raise PermissionSpecificationError(
-                    'arg1 must be a filename when \'which\' == "read"' )
-        return os.access( path_or_fmode, os.R_OK )
-    
-    elif which == 'write':
-        if type(path_or_fmode) != type(''):
+    if which in access_flags:
+        if not isinstance( path_or_fmode, str ):
             raise PermissionSpecificationError(
-                    'arg1 must be a filename when \'which\' == "write"' )
-        return os.access( path_or_fmode, os.W_OK )
-    
-    elif which == 'execute':
-        if type(path_or_fmode) != type(''):
-            raise PermissionSpecificationError(
-                    'arg1 must be a filename when \'which\' == "execute"' )
-        return os.access( path_or_fmode, os.X_OK )
+                    'arg1 must be a filename when \'which\' == "'+which+'"' )
+        return os.access( path_or_fmode, access_flags[which] )
 
     else:
         
-        if type(path_or_fmode) == type(2):
+        if isinstance( path_or_fmode, int ):
             fmode = path_or_fmode
         else:
             fmode = filemode( path_or_fmode )
@@ -379,23 +493,13 @@ def permission( path_or_fmode, which ):
             if fmode & stat.S_ISGID: return True
             return False
 
-        elif which.startswith( 'owner ' ):
-            s = which.split()[1]
-            if '-' in s:
-                return (fmode & owner_mask) == owner_bits[s]
-            return (fmode & owner_bits[s]) == owner_bits[s]
-
-        elif which.startswith( 'group ' ):
-            s = which.split()[1]
+        L = which.split()
+        if len(L) > 1 and L[0] in permission_scopes:
+            mask,table = permission_scopes[ L[0] ]
+            s = L[1]
             if '-' in s:
-                return (fmode & group_mask) == group_bits[s]
-            return (fmode & group_bits[s]) == group_bits[s]
-
-        elif which.startswith( 'world ' ):
-            s = which.split()[1]
-            if '-' in s:
-                return (fmode & world_mask) == world_bits[s]
-            return (fmode & world_bits[s]) == world_bits[s]
+                return (fmode & mask) == table[s]
+            return (fmode & table[s]) == table[s]
 
         raise PermissionSpecificationError( "unknown 'which' value: "+str(which) )
 
@@ -416,7 +520,19 @@ def change_filemode( fmode, spec, *more_specs ):
     For example, "u+x" means add user execute permission, and "g=rx" means
     set the group permissions to exactly read, no write, execute.
     """
-    for s in (spec,)+more_specs:
+    ops = parse_filemode_specs( (spec,)+more_specs )
+    return apply_filemode_ops( fmode, ops )
+
+
+def parse_filemode_specs( specs ):
+    """
+    Validates and converts change_filemode() specifications into a list of
+    operations for apply_filemode_ops(). Parsing once and applying many
+    times avoids string handling for every file in a recursive chmod.
+    """
+    ops = []
+
+    for s in specs:
         if len(s) < 2:
             raise PermissionSpecificationError( 'invalid specification: '+s )
         who = s[0]
@@ -429,25 +545,45 @@ def change_filemode( fmode, spec, *more_specs ):
             what = '-'
         else:
             what = s[2:]
+
         if who == 'u':
-            mask = owner_mask
-            if what not in owner_bits:
-                raise PermissionSpecificationError( 'invalid specification: '+s )
-            bits = owner_bits[what]
+            mask,table = owner_mask,owner_bits
         elif who == 'g':
-            if 'X' in what:
-                what = replace_conditional_execute( what, fmode )
-            mask = group_mask
-            if what not in group_bits:
-                raise PermissionSpecificationError( 'invalid specification: '+s )
-            bits = group_bits[what]
+            mask,table = group_mask,group_bits
         else:
-            if 'X' in what:
-                what = replace_conditional_execute( what, fmode )
-            mask = world_mask
-            if what not in world_bits:
+            mask,table = world_mask,world_bits
+
+        if who != 'u' and 'X' in what:
+            # the bits depend on the owner execute bit of the file, so
+            # compute both (None means invalid) and choose when applied
+            xbits = ( table.get( replace_conditional_execute( what, 0 ) ),
+                      table.get( replace_conditional_execute( what,
+                                                        stat.S_IXUSR ) ) )
+            ops.append( ( op, mask, None, xbits, s ) )
+
+        elif what in table:
+            ops.append( ( op, mask, table[what], None, s ) )
+
+        else:
+            raise PermissionSpecificationError( 'invalid specification: '+s )
+
+    return ops
+
+
+def apply_filemode_ops( fmode, ops ):
+    """
+    Returns the file mode 'fmode' modified by the operations returned from
+    parse_filemode_specs().
+    """
+    for op,mask,bits,xbits,s in ops:
+
+        if xbits != None:
+            if fmode & stat.S_IXUSR:
+                bits = xbits[1]
+            else:
+                bits = xbits[0]
+            if bits == None:
                 raise PermissionSpecificationError( 'invalid specification: '+s )
-            bits = world_bits[what]
 
         if op == '=':   fmode = ( fmode & (~mask) ) | bits
         elif op == '+': fmode = fmode | bits
@@ -473,10 +609,17 @@ def change_group( path, group_id ):
     Changes the group of 'path' to the given group id (an integer), or
     'group_id' can be the group name as a string.
     """
-    if type(group_id) == type(''):
-        import grp
-        group_id = grp.getgrnam( group_id ).gr_gid
     uid = os.stat( path ).st_uid
+    chown_group( path, uid, group_id )
+
+
+def chown_group( path, uid, group_id ):
+    """
+    Same as change_group() but the owner 'uid' of 'path' is given, which
+    avoids a stat of the path.
+    """
+    if isinstance( group_id, str ):
+        group_id = group_id_for_name( group_id )
     os.chown( path, uid, group_id )
 
 
@@ -492,8 +635,7 @@ def i_own( path ):
 def can_map_group_name_to_group_id( group_name ):
     ""
     try:
-        import grp
-        gid = grp.getgrnam( group_name )
+        gid = group_id_for_name( group_name )
     except KeyError:
         return False
 
@@ -515,16 +657,45 @@ def apply_chmod( path, *spec ):
         wg-alegra : change file group to "wg-alegra"
     """
     if spec:
+        groups,ops = split_chmod_specs( spec )
+        chmod_with_stat( path, None, groups, ops )
 
-        mL = []
-        for s in spec:
-            if len(s)>=2 and s[0] in 'ugo' and s[1] in '=+-':
-                mL.append(s)
-            else:
-                change_group( path, s )
 
-        if len(mL) > 0:
-            os.chmod( path, change_filemode( filemode( path ), *mL ) )
+def split_chmod_specs( specs ):
+    """
+    Separates apply_chmod() specifications into a list of group names and
+    a list of parsed file mode operations.
+    """
+    groups = []
+    mL = []
+    for s in specs:
+        if len(s)>=2 and s[0] in 'ugo' and s[1] in '=+-':
+            mL.append(s)
+        else:
+            groups.append(s)
+
+    return groups, parse_filemode_specs( mL )
+
+
+def chmod_with_stat( path, st, groups, ops ):
+    """
+    Same as apply_chmod() but with specs from split_chmod_specs(). The 'st'
+    is the os.stat() result for 'path', or None if it is not known. The path
+    is stat'ed at most once, unless both a group and a file mode are set.
+    """
+    if st == None:
+        st = os.stat( path )
+
+    for grp in groups:
+        chown_group( path, st.st_uid, grp )
+
+    if len(ops) > 0:
+        if len(groups) > 0:
+            # changing the group can clear the set-id bits
+            fm = filemode( path )
+        else:
+            fm = stat.S_IMODE( st.st_mode )
+        os.chmod( path, apply_filemode_ops( fm, ops ) )
 
 
 def chmod_recurse( path, filespecs=[], dirspecs=[], setgroup=None ):
@@ -533,7 +704,7 @@ def chmod_recurse( path, filespecs=[], dirspecs=[], setgroup=None ):
 
 
 def apply_itemized_chmod( path, filespecs=[], dirspecs=[],
-                          setgroup=None, recurse=True ):
+                          setgroup=None, recurse=True, workers=1 ):
     """
     Applies 'filespecs' to files and 'dirspecs' to directories.  Each spec
     is the same as for change_filemode(), such as
@@ -543,27 +714,70 @@ def apply_itemized_chmod( path, filespecs=[], dirspecs=[],
         o=--- : set other to no read, no write, no execute
 
     If 'recurse' is true, then recurses into directories.  Sets the file group
-    if 'setgroup' is given.  Ignores soft links.
+    if 'setgroup' is given.  Ignores soft links.  If 'workers' is greater than
+    one, files are changed using that many threads.
+    """
+    try:
+        st = os.lstat( path )
+    except OSError:
+        st = None
+
+    filespecs = split_chmod_specs( filespecs )
+    dirspecs = split_chmod_specs( dirspecs )
+
+    pool = make_worker_pool( workers )
+    try:
+        dirq = deque()
+        _apply_itemized_chmod_path( path, st, filespecs, dirspecs,
+                                    setgroup, dirq, pool )
+
+        if recurse:
+            # breadth first with a queue rather than recursion, so deep trees
+            # cannot hit the Python recursion limit
+            while len( dirq ) > 0:
+                dp = dirq.popleft()
+                for f in os.listdir( dp ):
+                    fp = os.path.join( dp, f )
+                    _apply_itemized_chmod_path( fp, os.lstat( fp ),
+                                                filespecs, dirspecs,
+                                                setgroup, dirq, pool )
+    finally:
+        pool.wait()
+
+
+def _apply_itemized_chmod_path( path, st, filespecs, dirspecs,
+                                setgroup, dirq, pool ):
     """
-    if os.path.islink( path ):
+    Applies the specs to a single path. The specs are the result of
+    split_chmod_specs(). Directories are changed immediately and appended
+    to 'dirq'; files are submitted to the worker 'pool'.
+    """
+    if st != None and stat.S_ISLNK( st.st_mode ):
         pass
 
-    elif os.path.isdir( path ):
+    elif st != None and stat.S_ISDIR( st.st_mode ):
+        dirst = st
         if setgroup:
-            change_group( path, setgroup )
-        if dirspecs:
-            apply_chmod( path, *dirspecs )
+            chown_group( path, st.st_uid, setgroup )
+            dirst = None
+        if dirspecs[0] or dirspecs[1]:
+            chmod_with_stat( path, dirst, dirspecs[0], dirspecs[1] )
 
-        if recurse:
-            for f in os.listdir( path ):
-                fp = os.path.join( path, f )
-                apply_itemized_chmod( fp, filespecs, dirspecs, setgroup, recurse )
+        dirq.append( path )
 
     else:
-        if filespecs:
-            apply_chmod( path, *filespecs )
-        if setgroup:
+        pool.submit( _apply_itemized_chmod_file, path, st, filespecs, setgroup )
+
+
+def _apply_itemized_chmod_file( path, st, filespecs, setgroup ):
+    ""
+    if filespecs[0] or filespecs[1]:
+        chmod_with_stat( path, st, filespecs[0], filespecs[1] )
+    if setgroup:
+        if st == None:
             change_group( path, setgroup )
+        else:
+            chown_group( path, st.st_uid, setgroup )
 
 
 ##############################################################################
@@ -575,73 +789,38 @@ integer stat.S_IRUSR|stat.S_IXUSR.
 """
 
 owner_mask = (stat.S_ISUID|stat.S_IRWXU)
-owner_bits = {
-        'r' : stat.S_IRUSR,
-        'w' : stat.S_IWUSR,
-        'x' : stat.S_IXUSR,
-        's' : stat.S_IXUSR|stat.S_ISUID,
-        'rw' : stat.S_IRUSR|stat.S_IWUSR,
-        'rx' : stat.S_IRUSR|stat.S_IXUSR,
-        'rs' : stat.S_IRUSR|stat.S_IXUSR|stat.S_ISUID,
-        'wx' : stat.S_IWUSR|stat.S_IXUSR,
-        'ws' : stat.S_IWUSR|stat.S_IXUSR|stat.S_ISUID,
-        'rwx' : stat.S_IRWXU,
-        'rws' : stat.S_IRWXU|stat.S_ISUID,
-    }
-owner_bits['-'] = 0
-owner_bits['---'] = 0
-owner_bits['r--'] = owner_bits['r']
-owner_bits['-w-'] = owner_bits['w']
-owner_bits['--x'] = owner_bits['x']
-owner_bits['--s'] = owner_bits['s']
-owner_bits['rw-'] = owner_bits['rw']
-owner_bits['r-x'] = owner_bits['rx']
-owner_bits['r-s'] = owner_bits['rs']
-owner_bits['-wx'] = owner_bits['wx']
-owner_bits['-ws'] = owner_bits['ws']
-
 group_mask = (stat.S_ISGID|stat.S_IRWXG)
-group_bits = {
-        'r' : stat.S_IRGRP,
-        'w' : stat.S_IWGRP,
-        'x' : stat.S_IXGRP,
-        's' : stat.S_IXGRP|stat.S_ISGID,
-        'rw' : stat.S_IRGRP|stat.S_IWGRP,
-        'rx' : stat.S_IRGRP|stat.S_IXGRP,
-        'rs' : stat.S_IRGRP|stat.S_IXGRP|stat.S_ISGID,
-        'wx' : stat.S_IWGRP|stat.S_IXGRP,
-        'ws' : stat.S_IWGRP|stat.S_IXGRP|stat.S_ISGID,
-        'rwx' : stat.S_IRWXG,
-        'rws' : stat.S_IRWXG|stat.S_ISGID,
-    }
-group_bits['-'] = 0
-group_bits['---'] = 0
-group_bits['r--'] = group_bits['r']
-group_bits['-w-'] = group_bits['w']
-group_bits['--x'] = group_bits['x']
-group_bits['--s'] = group_bits['s']
-group_bits['rw-'] = group_bits['rw']
-group_bits['r-x'] = group_bits['rx']
-group_bits['r-s'] = group_bits['rs']
-group_bits['-wx'] = group_bits['wx']
-group_bits['-ws'] = group_bits['ws']
+world_mask = stat.S_IRWXO
 
 
-world_mask = stat.S_IRWXO
-world_bits = {
-        'r' : stat.S_IROTH,
-        'w' : stat.S_IWOTH,
-        'x' : stat.S_IXOTH,
-        'rw' : stat.S_IROTH|stat.S_IWOTH,
-        'rx' : stat.S_IROTH|stat.S_IXOTH,
-        'wx' : stat.S_IWOTH|stat.S_IXOTH,
-        'rwx' : stat.S_IRWXO,
-    }
-world_bits['-'] = 0
-world_bits['---'] = 0
-world_bits['r--'] = world_bits['r']
-world_bits['-w-'] = world_bits['w']
-world_bits['--x'] = world_bits['x']
-world_bits['rw-'] = world_bits['rw']
-world_bits['r-x'] = world_bits['rx']
-world_bits['-wx'] = world_bits['wx']
+def build_permission_bits( rbit, wbit, xbit, sbit ):
+    """
+    Returns a dict mapping every permission string, such as "rx", "r-x",
+    "rws", "-" and "---", to its bit mask. The 's' letter is only allowed
+    if 'sbit' is non-zero.
+    """
+    xL = [ ('',0), ('x',xbit) ]
+    if sbit:
+        xL.append( ('s',xbit|sbit) )
+
+    bits = {}
+    for r,rb in [ ('',0), ('r',rbit) ]:
+        for w,wb in [ ('',0), ('w',wbit) ]:
+            for x,xb in xL:
+                mask = rb|wb|xb
+                bits[ ( r+w+x ) or '-' ] = mask
+                bits[ (r or '-')+(w or '-')+(x or '-') ] = mask
+
+    return bits
+
+
+owner_bits = build_permission_bits( stat.S_IRUSR, stat.S_IWUSR,
+                                    stat.S_IXUSR, stat.S_ISUID )
+group_bits = build_permission_bits( stat.S_IRGRP, stat.S_IWGRP,
+                                    stat.S_IXGRP, stat.S_ISGID )
+world_bits = build_permission_bits( stat.S_IROTH, stat.S_IWOTH,
+                                    stat.S_IXOTH, 0 )
+
+permission_scopes = { 'owner': ( owner_mask, owner_bits ),
+                      'group': ( group_mask, group_bits ),
+                      'world': ( world_mask, world_bits ) }
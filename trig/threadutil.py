@@ -9,6 +9,117 @@ try:
 except Exception:
   from io import StringIO
 
+try:
+  from queue import Queue
+except Exception:
+  from Queue import Queue
+
+
+def map_with_threads( func, items, maxthreads=8 ):
+    """
+    Returns [ func(item) for item in items ], but the calls are made by up
+    to 'maxthreads' threads.  The items are started in order.  If any call
+    raises an exception, the one from the first failed item in the list is
+    raised here after all the calls are done.
+    """
+    items = list( items )
+    nthreads = min( maxthreads, len( items ) )
+
+    if nthreads < 2:
+        return [ func( item ) for item in items ]
+
+    results = [ None ] * len( items )
+    errors = {}
+
+    def call_func( idx ):
+        try:
+            results[ idx ] = func( items[idx] )
+        except Exception:
+            errors[ idx ] = sys.exc_info()[1]
+
+    pool = ThreadPool( nthreads )
+    for idx in range( len( items ) ):
+        pool.submit( call_func, idx )
+    pool.wait()
+
+    if errors:
+        raise errors[ min( errors.keys() ) ]
+
+    return results
+
+
+def make_worker_pool( workers ):
+    """
+    Returns a ThreadPool if 'workers' is greater than one, otherwise a
+    SerialPool.
+    """
+    if workers > 1:
+        return ThreadPool( workers )
+    else:
+        return SerialPool()
+
+
+class SerialPool:
+    """
+    Same interface as ThreadPool, but calls the function immediately.
+    """
+
+    def submit(self, func, *args):
+        ""
+        func( *args )
+
+    def wait(self):
+        ""
+        pass
+
+
+class ThreadPool:
+    """
+    Runs submitted function calls in a fixed number of threads, in the
+    order they are submitted.  Once a call raises an exception, further
+    submissions are ignored, and the first exception is re-raised by wait().
+    """
+
+    def __init__(self, numthreads):
+        ""
+        self.queue = Queue()
+        self.errors = []
+
+        self.threads = []
+        for i in range( numthreads ):
+            t = threading.Thread( target=self._run )
+            t.daemon = True
+            t.start()
+            self.threads.append( t )
+
+    def submit(self, func, *args):
+        ""
+        if len( self.errors ) == 0:
+            self.queue.put( (func,args) )
+
+    def wait(self):
+        ""
+        for t in self.threads:
+            self.queue.put( None )
+        for t in self.threads:
+            t.join()
+
+        if len( self.errors ) > 0:
+            raise self.errors[0]
+
+    def _run(self):
+        ""
+        while True:
+            item = self.queue.get()
+            if item == None:
+                break
+
+            func,args = item
+            try:
+                func( *args )
+            except Exception:
+                self.errors.append( sys.exc_info()[1] )
+
 
 class BackgroundRunner:
 